@@ -0,0 +1,2 @@
+"""Load benchmarks for the API, run against a local Postgres with S3, Meilisearch and the cover
+sheet templater replaced by in-process fakes. See `python -m benchmarks --help`."""
@@ -0,0 +1,369 @@
+"""Runs the API benchmarks and prints the results as JSON.
+
+Needs DATABASE_URL to point at a migrated Postgres database. Use a throwaway one: the benchmarks
+add and remove documents of their own, and reset the Meilisearch sync state.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+# Settings read when silicon is imported. S3 and Meilisearch are faked, so theirs don't matter.
+os.environ.setdefault("MEILI_URL", "http://meilisearch")
+os.environ.setdefault("S3_URL", "http://s3")
+os.environ.setdefault("S3_ACCESS_KEY", "benchmark")
+os.environ.setdefault("S3_SECRET_KEY", "benchmark")
+os.environ.setdefault("MEILI_SYNC_ON_START", "false")
+# Start every run with cold caches
+os.environ.setdefault("COVER_CACHE_DIR", tempfile.mkdtemp(prefix="silicon-bench-covers-"))
+os.environ.setdefault("SDS_PDF_CACHE_DIR", tempfile.mkdtemp(prefix="silicon-bench-sds-"))
+
+import httpx  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from benchmarks import fakes  # noqa: E402
+
+SCENARIOS = (
+    "upload",
+    "upload_pipelined",
+    "bulk_upload",
+    "batch_read",
+    "search",
+    "checkout",
+    "meili_resync",
+)
+
+log = logging.getLogger("benchmarks")
+
+
+def percentile(latencies: list[float], p: float) -> float:
+    """Nearest-rank percentile of sorted latencies."""
+    return latencies[max(0, math.ceil(p / 100 * len(latencies)) - 1)]
+
+
+def peak_rss_kib() -> int:
+    """Peak resident set size of this process so far. Parse pool workers aren't included."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kibibytes everywhere else
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+async def measure(
+    name: str,
+    requests: list[Callable[[], Awaitable]],
+    concurrency: int,
+) -> dict:
+    """Runs the requests, `concurrency` at a time, and summarizes their latencies.
+
+    A request is a function returning an awaitable. Responses with an error status and raised
+    exceptions count as errors, but are still timed.
+    """
+    latencies: list[float] = []
+    errors = 0
+    pending = iter(requests)
+
+    async def worker() -> None:
+        nonlocal errors
+        for request in pending:
+            start = time.perf_counter()
+            try:
+                response = await request()
+                if isinstance(response, httpx.Response) and response.is_error:
+                    errors += 1
+                    log.warning(f"{name}: {response.status_code} {response.text[:200]}")
+            except Exception:
+                errors += 1
+                log.exception(f"{name}: request failed")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "scenario": name,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        **{
+            f"p{p}_ms": round(percentile(latencies, p) * 1000, 3)
+            for p in (50, 95, 99)
+        },
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "peak_rss_kib": peak_rss_kib(),
+    }
+    log.info(json.dumps(result))
+    return result
+
+
+class Benchmark:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.random = random.Random(args.seed)
+        # Product numbers of uploaded documents, never reused within a run so uploads aren't
+        # deduplicated by content
+        self.next_product_number = 100_000
+        self.sds_ids: list[int] = []
+
+    def pdf(self) -> bytes:
+        self.next_product_number += 1
+        return fakes.make_pdf(str(self.next_product_number), self.args.pdf_pages)
+
+    async def setup(self) -> None:
+        import silicon.routes.sds
+        import silicon.utils.ingest
+        from silicon import app
+
+        # Keep the app's own logs from drowning out the results. Importing the app configures its
+        # logging, so this has to come after.
+        logging.getLogger("silicon").setLevel(logging.WARNING)
+
+        # The parser is faked rather than fed real SDS PDFs, but still runs in the parse pool
+        silicon.utils.ingest.parse_sds = fakes.parse_sds
+        silicon.utils.ingest.parse_sds_file = fakes.parse_sds_file
+        silicon.routes.sds.parse_sds = fakes.parse_sds
+
+        self.app = app
+        await app.router.startup()
+
+        self.meilisearch = fakes.FakeMeilisearch(self.args.meili_latency)
+        await app.state.meili.aclose()
+        app.state.meili = self.meilisearch.client()
+        app.state.s3 = fakes.FakeS3(self.args.s3_latency)
+        app.state.templater = fakes.FakeTemplater(self.args.render_time)
+
+        self.client = httpx.AsyncClient(app=app, base_url="http://benchmark/api/v1", timeout=None)
+        await self.cleanup()
+
+    async def teardown(self) -> None:
+        await self.cleanup()
+        await self.client.aclose()
+        await self.app.router.shutdown()
+
+    async def cleanup(self) -> None:
+        from silicon.models import SafetyDataSheet
+
+        async with self.app.state.engine.begin() as conn:
+            await conn.execute(
+                delete(SafetyDataSheet)
+                .where(SafetyDataSheet.product_brand == fakes.BENCHMARK_BRAND)
+            )
+
+    async def seed(self) -> None:
+        """Uploads the documents that reads and checkouts pick from."""
+        while len(self.sds_ids) < self.args.documents:
+            count = min(50, self.args.documents - len(self.sds_ids))
+            files = [("files", (f"{n}.pdf", self.pdf(), "application/pdf")) for n in range(count)]
+            response = await self.client.post("/sds/bulk", files=files)
+            response.raise_for_status()
+            self.sds_ids.extend(
+                result["id"] for result in response.json()["results"]
+                if result["status"] == "ingested"
+            )
+
+    def upload(self, **params) -> Callable[[], Awaitable]:
+        pdf = self.pdf()
+        return lambda: self.client.post(
+            "/sds/",
+            params={"force": "true", **params},
+            files={"file": ("sds.pdf", pdf, "application/pdf")},
+        )
+
+    def bulk_upload(self) -> Callable[[], Awaitable]:
+        files = [
+            ("files", (f"{n}.pdf", self.pdf(), "application/pdf"))
+            for n in range(self.args.bulk_size)
+        ]
+        return lambda: self.client.post("/sds/bulk", files=files)
+
+    def batch_read(self, size: int) -> Callable[[], Awaitable]:
+        sds_ids = self.random.sample(self.sds_ids, min(size, len(self.sds_ids)))
+        return lambda: self.client.get("/sds/batch", params={"sds_ids": sds_ids})
+
+    def search(self) -> Callable[[], Awaitable]:
+        # A few popular queries make up most searches, like in production
+        query = str(100_000 + self.random.randint(1, 20) * 10)[:-1]
+        return lambda: self.client.get("/sds/search", params={"q": query})
+
+    def checkout(self, size: int) -> Callable[[], Awaitable]:
+        sds_ids = self.random.sample(self.sds_ids, min(size, len(self.sds_ids)))
+        payload = {
+            "product_name": "Benchmark mixture",
+            "destination": "Canada",
+            "measurement_type": "volume",
+            "sensitivity": "public",
+            "certification_date": "2022-01-01",
+            "items": [
+                {"sds_id": sds_id, "percentage": round(100 / len(sds_ids), 2)}
+                for sds_id in sds_ids
+            ],
+        }
+        return lambda: self.client.post("/sds/checkout", json=payload)
+
+    async def meili_resync(self) -> None:
+        from silicon.models import SyncState
+        from silicon.utils.search import MEILI_SYNC_STATE_NAME, meili_sync
+
+        # Forget the last sync, so every document is sent again
+        async with self.app.state.engine.begin() as conn:
+            await conn.execute(delete(SyncState).where(SyncState.name == MEILI_SYNC_STATE_NAME))
+        await meili_sync(self.app.state)
+
+    async def run(self) -> list[dict]:
+        args = self.args
+        n = args.requests
+        results = []
+
+        await self.seed()
+
+        if "upload" in args.scenarios:
+            results.append(await measure(
+                "upload",
+                [self.upload() for _ in range(n)],
+                args.concurrency,
+            ))
+        if "upload_pipelined" in args.scenarios:
+            results.append(await measure(
+                "upload_pipelined",
+                [self.upload(pipelined="true") for _ in range(n)],
+                args.concurrency,
+            ))
+        if "bulk_upload" in args.scenarios:
+            results.append(await measure(
+                f"bulk_upload_{args.bulk_size}",
+                [self.bulk_upload() for _ in range(max(1, n // args.bulk_size))],
+                args.concurrency,
+            ))
+        if "batch_read" in args.scenarios:
+            for size in args.batch_sizes:
+                results.append(await measure(
+                    f"batch_read_{size}",
+                    [self.batch_read(size) for _ in range(n)],
+                    args.concurrency,
+                ))
+        if "search" in args.scenarios:
+            results.append(await measure(
+                "search",
+                [self.search() for _ in range(n)],
+                args.concurrency,
+            ))
+        if "checkout" in args.scenarios:
+            for size in args.checkout_sizes:
+                results.append(await measure(
+                    f"checkout_{size}",
+                    [self.checkout(size) for _ in range(n)],
+                    args.concurrency,
+                ))
+        if "meili_resync" in args.scenarios:
+            results.append(await measure(
+                "meili_resync",
+                [self.meili_resync for _ in range(args.resync_runs)],
+                1,
+            ))
+
+        return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    benchmark = Benchmark(args)
+    await benchmark.setup()
+    try:
+        started_at = datetime.now(timezone.utc)
+        scenarios = await benchmark.run()
+    finally:
+        await benchmark.teardown()
+
+    return {
+        "started_at": started_at.isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": scenarios,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    def sizes(value: str) -> list[int]:
+        return [int(size) for size in value.split(",")]
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument(
+        "--scenario",
+        dest="scenarios",
+        action="append",
+        choices=SCENARIOS,
+        help="Scenario to run, may be given several times. Runs all of them by default.",
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--documents", type=int, default=500, help="Documents to read from")
+    parser.add_argument("--pdf-pages", type=int, default=4, help="Pages per uploaded PDF")
+    parser.add_argument("--bulk-size", type=int, default=20, help="PDFs per bulk upload")
+    parser.add_argument("--batch-sizes", type=sizes, default=[1, 10, 50, 200])
+    parser.add_argument("--checkout-sizes", type=sizes, default=[1, 10, 50])
+    parser.add_argument("--resync-runs", type=int, default=3)
+    parser.add_argument("--s3-latency", type=float, default=0.0, help="Seconds per S3 call")
+    parser.add_argument(
+        "--meili-latency",
+        type=float,
+        default=0.0,
+        help="Seconds per Meilisearch call",
+    )
+    parser.add_argument(
+        "--render-time",
+        type=float,
+        default=0.0,
+        help="Seconds each cover sheet render blocks for",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for picking documents")
+    parser.add_argument("--output", help="File to write the results to, instead of stdout")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    if "DATABASE_URL" not in os.environ:
+        sys.exit("DATABASE_URL must point at a migrated Postgres database")
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(message)s")
+
+    results = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
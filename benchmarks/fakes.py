@@ -0,0 +1,197 @@
+"""In-process stand-ins for the services the API talks to, so benchmarks measure the API itself.
+
+Each fake can add a fixed latency to its calls to approximate a real deployment.
+"""
+import asyncio
+import io
+import json
+import time
+
+import httpx
+from botocore.exceptions import ClientError
+from PyPDF2 import PdfReader, PdfWriter
+
+from silicon.utils.sds import get_checkout_fields
+
+BENCHMARK_BRAND = "BENCH"
+
+
+def make_pdf(product_number: str, pages: int = 1) -> bytes:
+    """Makes a PDF that `parse_sds` below reads as the SDS of the given product."""
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(612, 792)
+    writer.add_metadata({
+        "/Title": f"Benchmark product {product_number}",
+        "/Subject": product_number,
+    })
+    pdf = io.BytesIO()
+    writer.write(pdf)
+    return pdf.getvalue()
+
+
+def parse_sds(content: bytes) -> tuple[dict, dict[str, str | list[str]], dict]:
+    """Stands in for `silicon.utils.sds.parse_sds`, reading the product from the PDF metadata.
+
+    Runs in the parse pool like the real parser, so the pool's overhead is still measured.
+    """
+    metadata = PdfReader(io.BytesIO(content)).metadata
+    product_number = metadata["/Subject"]
+    # Spread the documents over a few hazard profiles, like a real catalogue
+    flammable = int(product_number) % 3 == 0
+    product_identifiers = {
+        "product_name": metadata["/Title"],
+        "product_brand": BENCHMARK_BRAND,
+        "product_number": product_number,
+        "cas_number": f"{product_number}-00-0",
+        "signal_word": "Danger" if flammable else "Warning",
+        "hazards": ["GHS02", "GHS07"] if flammable else ["GHS07"],
+        "statements": ["H225", "H319", "H336"] if flammable else ["H319"],
+    }
+    sds_json = {"product_name": metadata["/Title"], "sections": [{"number": n} for n in range(16)]}
+    return sds_json, product_identifiers, get_checkout_fields(content, product_identifiers)
+
+
+def parse_sds_file(path: str) -> tuple[dict, dict[str, str | list[str]], dict]:
+    with open(path, "rb") as file:
+        return parse_sds(file.read())
+
+
+class FakeBody:
+    def __init__(self, content: bytes):
+        self.content = io.BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.content.read(size)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeS3:
+    """An S3 client keeping objects in memory, implementing what the API uses."""
+
+    class meta:
+        class events:
+            @staticmethod
+            def unregister(*args, **kwargs):
+                pass
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+
+    async def wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        await self.wait()
+        self.objects[Key] = bytes(Body)
+        return {}
+
+    async def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        await self.wait()
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": FakeBody(self.objects[Key])}
+
+    async def copy_object(self, Bucket: str, Key: str, CopySource: dict, **kwargs) -> dict:
+        await self.wait()
+        self.objects[Key] = self.objects[CopySource["Key"]]
+        return {}
+
+    async def delete_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        await self.wait()
+        self.objects.pop(Key, None)
+        return {}
+
+    async def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> dict:
+        await self.wait()
+        upload_id = str(len(self.uploads))
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs) -> dict:
+        await self.wait()
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": str(PartNumber)}
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload) -> dict:
+        await self.wait()
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+        return {}
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId) -> dict:
+        self.uploads.pop(UploadId, None)
+        return {}
+
+
+class FakeMeilisearch:
+    """A Meilisearch HTTP API that accepts documents and finishes every task straight away, and
+    searches the documents' product names and numbers."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.documents: dict[int, dict] = {}
+        self.task_uid = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if request.method == "POST" and request.url.path.endswith("/documents"):
+            for document in json.loads(request.content):
+                self.documents[document["id"]] = document
+            self.task_uid += 1
+            return httpx.Response(202, json={"taskUid": self.task_uid, "status": "enqueued"})
+        if request.method == "GET" and "/tasks/" in request.url.path:
+            task_uid = int(request.url.path.rsplit("/", 1)[1])
+            return httpx.Response(200, json={"uid": task_uid, "status": "succeeded"})
+        if request.method == "POST" and request.url.path.endswith("/search"):
+            return httpx.Response(200, json=self.search(json.loads(request.content)))
+        return httpx.Response(404, json={"message": "Not faked"})
+
+    def search(self, query: dict) -> dict:
+        q = query.get("q", "").lower()
+        hits = [
+            {"id": document["id"]}
+            for document in self.documents.values()
+            if q in document["product_name"].lower() or q in document["product_number"]
+        ]
+        offset, limit = query.get("offset", 0), query.get("limit", 20)
+        return {"hits": hits[offset:offset + limit], "estimatedTotalHits": len(hits)}
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url="http://meilisearch",
+            transport=httpx.MockTransport(self.handle),
+        )
+
+
+class FakeTemplater:
+    """Renders a blank one page cover sheet instead of building one with LaTeX.
+
+    Set `render_time` to block for that many seconds per render, like a LaTeX build does.
+    """
+
+    def __init__(self, render_time: float = 0.0):
+        self.render_time = render_time
+        writer = PdfWriter()
+        writer.add_blank_page(595, 842)
+        cover_sheet = io.BytesIO()
+        writer.write(cover_sheet)
+        self.cover_sheet = cover_sheet.getvalue()
+
+    def generate_pdf(self, context: dict) -> io.BytesIO:
+        if self.render_time:
+            # Blocks the calling thread, like a LaTeX build in the render pool does
+            time.sleep(self.render_time)
+        return io.BytesIO(self.cover_sheet)
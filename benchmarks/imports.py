@@ -0,0 +1,87 @@
+"""Measures how long importing the app takes, and which modules the time goes to, and prints the
+results as JSON.
+
+Every run imports the app module, silicon.main, in a fresh interpreter with `-X importtime`, the
+same as a gunicorn worker that isn't preloaded does when it loads `silicon:app`. Worker startup
+after the import is reported by each worker instead, under `boot` in /stats and as
+`silicon_worker_boot_seconds` in /metrics.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+# Settings read when silicon is imported, nothing is connected to
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/silicon")
+os.environ.setdefault("MEILI_URL", "http://meilisearch")
+os.environ.setdefault("S3_URL", "http://s3")
+os.environ.setdefault("S3_ACCESS_KEY", "benchmark")
+os.environ.setdefault("S3_SECRET_KEY", "benchmark")
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Imports `module` in a fresh interpreter, returning how long importing each module it
+    pulled in took, including the modules that one imported in turn, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    lines = result.stderr.splitlines()
+    if result.returncode:
+        error = "\n".join(line for line in lines if not line.startswith("import time:"))
+        sys.exit(f"Importing {module} failed:\n{error}")
+
+    times = {}
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        # Skips the header line
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(module: str, runs: int, top: int) -> dict:
+    samples = [import_times(module) for _ in range(runs)]
+
+    def median(name: str) -> float:
+        return statistics.median(sample.get(name, 0) for sample in samples) / 1_000_000
+
+    # Times include the modules each one imported, so packages rank above their submodules
+    imported = {name for sample in samples for name in sample if name != module}
+    slowest = sorted(imported, key=median, reverse=True)[:top]
+    return {
+        "module": module,
+        "python": platform.python_version(),
+        "runs": runs,
+        "total": round(median(module), 4),
+        "slowest": {name: round(median(name), 4) for name in slowest},
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.imports", description=__doc__)
+    parser.add_argument("--module", default="silicon.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Imports to take the median of")
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules to report")
+    parser.add_argument("--output", help="File to write the results to, instead of stdout")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results = json.dumps(measure(args.module, args.runs, args.top), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
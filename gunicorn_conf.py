@@ -3,6 +3,9 @@
 import json
 import multiprocessing
 import os
+import shutil
+import tempfile
+import time
 
 use_max_workers = int(os.getenv("MAX_WORKERS", "0"))
 web_concurrency = int(os.getenv("WEB_CONCURRENCY", "0"))
@@ -29,6 +32,9 @@ keepalive = int(os.getenv("KEEP_ALIVE", "5"))
 
 forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "*")
 
+# Imports the app once in the master so workers are forked with it already loaded
+preload_app = os.getenv("PRELOAD_APP", "false").lower() in ("1", "true", "yes", "on")
+
 # For debugging and testing
 log_data = {
     "loglevel": loglevel,
@@ -37,6 +43,7 @@ log_data = {
     "graceful_timeout": graceful_timeout,
     "timeout": timeout,
     "keepalive": keepalive,
+    "preload_app": preload_app,
     "errorlog": errorlog,
     "accesslog": accesslog,
     # Additional, non-gunicorn variables
@@ -46,3 +53,32 @@ log_data = {
     "port": port,
 }
 print(json.dumps(log_data))
+
+# Each worker writes its Prometheus metrics here so /metrics can aggregate them all. It has to be
+# set before the app imports prometheus_client, and is emptied whenever gunicorn starts. This is
+# done here rather than in `on_starting`, which only runs after a preloaded app is imported.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "silicon-prometheus"),
+)
+shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+os.makedirs(prometheus_multiproc_dir)
+
+
+def on_starting(server):
+    # The app imports some modules on first use, load those before forking too
+    if server.cfg.preload_app:
+        from silicon.utils.boot import preload_modules
+
+        preload_modules()
+
+
+def post_fork(server, worker):
+    # Lets the worker report how long it took to boot, see silicon.utils.boot
+    os.environ["SILICON_WORKER_STARTED_AT"] = str(time.time())
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
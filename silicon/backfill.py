@@ -0,0 +1,91 @@
+"""Fills in the checkout fields of SDS documents ingested before they were precomputed.
+
+Run with `python -m silicon.backfill` after migrating, as a one-off job alongside the app rather
+than before starting it, as it fetches the PDF of every document to backfill from S3. Checkout
+works in the meantime. Documents that already have the fields are skipped, so it is safe to run
+again. Documents whose PDF can't be fetched get all fields but their page count, which is retried
+on the next run.
+"""
+import asyncio
+import logging
+import logging.config
+
+from botocore.exceptions import ClientError
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from silicon.constants import (
+    BULK_INSERT_CHUNK_SIZE,
+    DATABASE_URL,
+    S3_BUCKET_NAME,
+    LogConfig
+)
+from silicon.models import SafetyDataSheet
+from silicon.utils.ingest import (
+    notify_sds_changed,
+    open_s3_client,
+    sds_filename
+)
+from silicon.utils.sds import get_cover_fields, get_page_count
+
+log = logging.getLogger("silicon")
+
+
+async def backfill_checkout_fields() -> None:
+    engine = create_async_engine(DATABASE_URL)
+
+    last_id = 0
+    updated = partial = skipped = 0
+    try:
+        async with open_s3_client() as client:
+            while True:
+                async with engine.begin() as conn:
+                    stmt = select(SafetyDataSheet.__table__) \
+                        .where(SafetyDataSheet.page_count.is_(None)) \
+                        .where(SafetyDataSheet.id > last_id) \
+                        .order_by(SafetyDataSheet.id) \
+                        .limit(BULK_INSERT_CHUNK_SIZE)
+                    rows = (await conn.execute(stmt)).fetchall()
+
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                for sds in rows:
+                    fields = get_cover_fields(sds._mapping)
+                    filename = sds_filename(sds.product_brand, sds.product_number)
+                    try:
+                        response = await client.get_object(Bucket=S3_BUCKET_NAME, Key=filename)
+                        async with response["Body"] as body:
+                            fields["page_count"] = get_page_count(await body.read())
+                    except ClientError:
+                        # Backfilled by an earlier run already, apart from the page count
+                        if sds.latex_product_name is not None:
+                            log.warning(f"Skipping SDS {sds.id}, failed to fetch {filename}")
+                            skipped += 1
+                            continue
+                        log.warning(f"Backfilling SDS {sds.id} but its page count, failed to "
+                                    f"fetch {filename}")
+                        partial += 1
+                    else:
+                        updated += 1
+
+                    async with engine.begin() as conn:
+                        await conn.execute(
+                            update(SafetyDataSheet)
+                            .where(SafetyDataSheet.id == sds.id)
+                            .values(**fields)
+                        )
+                        await notify_sds_changed(conn, [sds.id])
+    finally:
+        await engine.dispose()
+
+    log.info(
+        f"Backfilled checkout fields of {updated} SDS documents, {partial} without their page "
+        f"count, skipped {skipped}"
+    )
+
+
+if __name__ == "__main__":
+    logging.config.dictConfig(LogConfig().dict())
+    asyncio.run(backfill_checkout_fields())
@@ -1,19 +1,127 @@
+import os
+import tempfile
+
 from decouple import config
 from pydantic import BaseModel
 
 DEBUG = config("DEBUG", cast=bool, default=False)
 DATABASE_URL = config("DATABASE_URL")
+# Connections kept open by each app process, and how many more may be opened under load
+DATABASE_POOL_SIZE = config("DATABASE_POOL_SIZE", cast=int, default=5)
+DATABASE_MAX_OVERFLOW = config("DATABASE_MAX_OVERFLOW", cast=int, default=10)
+# Seconds to wait for a connection once the pool and overflow are exhausted
+DATABASE_POOL_TIMEOUT = config("DATABASE_POOL_TIMEOUT", cast=float, default=30.0)
+DATABASE_POOL_PRE_PING = config("DATABASE_POOL_PRE_PING", cast=bool, default=True)
+# Prepared statements cached per connection, set to 0 when running behind PgBouncer
+DATABASE_STATEMENT_CACHE_SIZE = config("DATABASE_STATEMENT_CACHE_SIZE", cast=int, default=100)
+DATABASE_ECHO = config("DATABASE_ECHO", cast=bool, default=False)
 
 MEILI_URL = config("MEILI_URL")
 MEILI_API_KEY = config("MEILI_API_KEY", default=None)
 MEILI_SYNC_ON_START = config("MEILI_SYNC_ON_START", cast=bool, default=False)
 MEILI_INDEX_NAME = config("MEILI_INDEX_NAME", default="msds")
+MEILI_SYNC_CHUNK_SIZE = config("MEILI_SYNC_CHUNK_SIZE", cast=int, default=1000)
+# Seconds below the sync high-water mark that are synced again, as `updated_at` is set when a
+# transaction starts and a long one can commit rows below a mark recorded in the meantime
+MEILI_SYNC_SAFETY_WINDOW = config("MEILI_SYNC_SAFETY_WINDOW", cast=int, default=600)
+# Seconds to wait for Meilisearch to process the documents sent to it
+MEILI_TASK_TIMEOUT = config("MEILI_TASK_TIMEOUT", cast=int, default=300)
+# Ids of the hits of recent searches, cached by each app process for SEARCH_CACHE_TTL seconds
+SEARCH_CACHE_SIZE = config("SEARCH_CACHE_SIZE", cast=int, default=256)
+SEARCH_CACHE_TTL = config("SEARCH_CACHE_TTL", cast=float, default=30.0)
+SEARCH_PAGE_SIZE = config("SEARCH_PAGE_SIZE", cast=int, default=20)
+SEARCH_MAX_PAGE_SIZE = config("SEARCH_MAX_PAGE_SIZE", cast=int, default=100)
+SEARCH_OUTBOX_BATCH_SIZE = config("SEARCH_OUTBOX_BATCH_SIZE", cast=int, default=1000)
+SEARCH_OUTBOX_POLL_INTERVAL = config("SEARCH_OUTBOX_POLL_INTERVAL", cast=float, default=1.0)
+# Upper bound in seconds on the exponential backoff between retries of failed documents
+SEARCH_OUTBOX_MAX_BACKOFF = config("SEARCH_OUTBOX_MAX_BACKOFF", cast=int, default=300)
 
 S3_URL = config("S3_URL", default=None)
 S3_PUBLIC_URL = config("S3_PUBLIC_URL", default=S3_URL)
 S3_ACCESS_KEY = config("S3_ACCESS_KEY")
 S3_SECRET_KEY = config("S3_SECRET_KEY")
 S3_BUCKET_NAME = config("S3_BUCKET_NAME", default="msds")
+S3_UPLOAD_CONCURRENCY = config("S3_UPLOAD_CONCURRENCY", cast=int, default=8)
+# Connections kept open to S3 by each app process, shared by all uploads and downloads
+S3_MAX_POOL_CONNECTIONS = config("S3_MAX_POOL_CONNECTIONS", cast=int, default=50)
+# PDFs larger than this are uploaded in parts, S3 requires parts of at least 5 MiB
+S3_MULTIPART_THRESHOLD = config("S3_MULTIPART_THRESHOLD", cast=int, default=16 * 1024 * 1024)
+S3_MULTIPART_PART_SIZE = config("S3_MULTIPART_PART_SIZE", cast=int, default=8 * 1024 * 1024)
+S3_MULTIPART_CONCURRENCY = config("S3_MULTIPART_CONCURRENCY", cast=int, default=4)
+# PDFs are kept under this prefix while a pipelined upload parses them. Leftovers of crashed
+# uploads can be cleaned up with a bucket lifecycle rule on the prefix.
+S3_UPLOAD_PREFIX = config("S3_UPLOAD_PREFIX", default="uploads/")
+
+PARSE_POOL_WORKERS = config("PARSE_POOL_WORKERS", cast=int, default=2)
+# Requires Python 3.11+, 0 keeps workers alive for the lifetime of the pool
+PARSE_POOL_MAX_TASKS_PER_CHILD = config("PARSE_POOL_MAX_TASKS_PER_CHILD", cast=int, default=0)
+PARSE_POOL_QUEUE_SIZE = config("PARSE_POOL_QUEUE_SIZE", cast=int, default=8)
+
+BULK_INSERT_CHUNK_SIZE = config("BULK_INSERT_CHUNK_SIZE", cast=int, default=500)
+# Limits on the PDFs extracted from each ZIP archive of a bulk upload, as they are decompressed
+# into memory. PDFs past them are reported as failed.
+BULK_ZIP_MAX_FILES = config("BULK_ZIP_MAX_FILES", cast=int, default=1000)
+BULK_ZIP_MAX_FILE_SIZE = config("BULK_ZIP_MAX_FILE_SIZE", cast=int, default=64 * 1024 * 1024)
+BULK_ZIP_MAX_TOTAL_SIZE = config("BULK_ZIP_MAX_TOTAL_SIZE", cast=int, default=512 * 1024 * 1024)
+
+# Number of upload job workers run by each app process, 0 leaves jobs to other processes
+UPLOAD_JOB_WORKERS = config("UPLOAD_JOB_WORKERS", cast=int, default=2)
+UPLOAD_JOB_POLL_INTERVAL = config("UPLOAD_JOB_POLL_INTERVAL", cast=float, default=1.0)
+UPLOAD_JOB_TIMEOUT = config("UPLOAD_JOB_TIMEOUT", cast=int, default=600)
+
+COVER_CACHE_SIZE = config("COVER_CACHE_SIZE", cast=int, default=64)
+COVER_CACHE_DIR = config(
+    "COVER_CACHE_DIR",
+    default=os.path.join(tempfile.gettempdir(), "silicon", "covers"),
+)
+COVER_CACHE_MAX_BYTES = config("COVER_CACHE_MAX_BYTES", cast=int, default=256 * 1024 * 1024)
+
+# Pipelined uploads are spooled here while they are parsed and uploaded
+UPLOAD_SPOOL_DIR = config("UPLOAD_SPOOL_DIR", default=tempfile.gettempdir())
+SDS_PDF_CACHE_DIR = config(
+    "SDS_PDF_CACHE_DIR",
+    default=os.path.join(tempfile.gettempdir(), "silicon", "sds"),
+)
+SDS_PDF_CACHE_MAX_BYTES = config("SDS_PDF_CACHE_MAX_BYTES", cast=int, default=1024 * 1024 * 1024)
+CHECKOUT_FETCH_CONCURRENCY = config("CHECKOUT_FETCH_CONCURRENCY", cast=int, default=8)
+# Checkouts rendered at once by each app process, and how many more may wait for their turn
+CHECKOUT_CONCURRENCY = config("CHECKOUT_CONCURRENCY", cast=int, default=4)
+CHECKOUT_QUEUE_SIZE = config("CHECKOUT_QUEUE_SIZE", cast=int, default=16)
+RENDER_POOL_WORKERS = config("RENDER_POOL_WORKERS", cast=int, default=2)
+# Merged checkout PDFs larger than this are spooled to disk instead of kept in memory
+PDF_SPOOL_MAX_SIZE = config("PDF_SPOOL_MAX_SIZE", cast=int, default=8 * 1024 * 1024)
+PDF_CHUNK_SIZE = config("PDF_CHUNK_SIZE", cast=int, default=64 * 1024)
+# SDS rows without their `data`, cached by each app process, kept up to date through Postgres
+# notifications.
+# Entries also expire after SDS_CACHE_TTL seconds in case a notification is missed.
+SDS_CACHE_SIZE = config("SDS_CACHE_SIZE", cast=int, default=1024)
+SDS_CACHE_TTL = config("SDS_CACHE_TTL", cast=float, default=300.0)
+# Seconds between checks that the connection listening for notifications is still open
+SDS_CACHE_LISTEN_CHECK_INTERVAL = config(
+    "SDS_CACHE_LISTEN_CHECK_INTERVAL",
+    cast=float,
+    default=5.0,
+)
+SDS_LIST_PAGE_SIZE = config("SDS_LIST_PAGE_SIZE", cast=int, default=50)
+SDS_LIST_MAX_PAGE_SIZE = config("SDS_LIST_MAX_PAGE_SIZE", cast=int, default=500)
+# Rows fetched from the database at a time by exports, which bounds their memory use
+SDS_EXPORT_FETCH_SIZE = config("SDS_EXPORT_FETCH_SIZE", cast=int, default=1000)
+
+# Opens database connections and starts pool workers before serving, so first requests are fast
+STARTUP_WARM_UP = config("STARTUP_WARM_UP", cast=bool, default=True)
+
+# Profiles requests sent with the X-Profile header, and this fraction of all other requests.
+# Profiles are kept in PROFILE_DIR, which should be shared by every app process.
+PROFILING = config("PROFILING", cast=bool, default=False)
+PROFILE_SAMPLE_RATE = config("PROFILE_SAMPLE_RATE", cast=float, default=0.0)
+# "wall" for elapsed time, including waiting on I/O, or "cpu" for processor time only
+PROFILE_CLOCK = config("PROFILE_CLOCK", default="wall")
+PROFILE_DIR = config(
+    "PROFILE_DIR",
+    default=os.path.join(tempfile.gettempdir(), "silicon", "profiles"),
+)
+# Only the most recent profiles are kept
+PROFILE_MAX_COUNT = config("PROFILE_MAX_COUNT", cast=int, default=200)
 
 
 class LogConfig(BaseModel):
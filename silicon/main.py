@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import logging.config
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from typing import Callable
+
+import httpx
+from fastapi import APIRouter, FastAPI, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from silicon.constants import (
+    CHECKOUT_CONCURRENCY,
+    CHECKOUT_QUEUE_SIZE,
+    COVER_CACHE_DIR,
+    COVER_CACHE_MAX_BYTES,
+    COVER_CACHE_SIZE,
+    DEBUG,
+    MEILI_API_KEY,
+    MEILI_SYNC_ON_START,
+    MEILI_URL,
+    PARSE_POOL_MAX_TASKS_PER_CHILD,
+    PARSE_POOL_QUEUE_SIZE,
+    PARSE_POOL_WORKERS,
+    RENDER_POOL_WORKERS,
+    SDS_CACHE_SIZE,
+    SDS_CACHE_TTL,
+    SDS_PDF_CACHE_DIR,
+    SDS_PDF_CACHE_MAX_BYTES,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+    STARTUP_WARM_UP,
+    UPLOAD_JOB_WORKERS,
+    LogConfig
+)
+from silicon.routes import routers
+from silicon.utils.boot import BootTimer, warm_up
+from silicon.utils.cache import CoverSheetCache, DiskCache, LRUCache
+from silicon.utils.db import create_engine
+from silicon.utils.ingest import open_s3_client
+from silicon.utils.jobs import process_upload_jobs
+from silicon.utils.metrics import (
+    observe_request,
+    server_timing,
+    start_stages,
+    update_pool_gauges
+)
+from silicon.utils.pool import BoundedExecutor, Limiter, create_parse_pool
+from silicon.utils.profiling import ProfileMiddleware
+from silicon.utils.records import listen_for_sds_changes
+from silicon.utils.search import drain_search_outbox, meili_sync
+
+logging.config.dictConfig(LogConfig().dict())
+log = logging.getLogger("silicon")
+
+app = FastAPI(
+    docs_url="/api/v1/docs",
+    redoc_url="/api/v1/redoc",
+    openapi_url="/api/v1/openapi.json",
+)
+app_router = APIRouter(prefix="/api/v1")
+
+if DEBUG:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://127.0.0.1:3000",
+            "http://localhost:3000",
+        ],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        allow_credentials=True,
+    )
+
+for router in routers:
+    app_router.include_router(router)
+
+app.include_router(app_router)
+
+
+@app.on_event("startup")
+async def start() -> None:
+    """Sets up the database connection and SDS record cache, S3 client and SDS PDF cache, search
+    cache, HTTP client, templater and cover sheet cache, render pool, parse pool, upload job
+    workers, search outbox drainer, and the listener keeping the record cache up to date.
+
+    Then warms up the worker, and logs how long each step took.
+    """
+    boot = BootTimer()
+
+    with boot.phase("database"):
+        app.state.engine = create_engine()
+        app.state.async_session = sessionmaker(
+            app.state.engine,
+            expire_on_commit=False,
+            class_=AsyncSession,
+        )
+
+    with boot.phase("clients"):
+        app.state.meili = httpx.AsyncClient(
+            base_url=MEILI_URL,
+            headers={"Authorization": f"Bearer {MEILI_API_KEY}"}
+        )
+
+        app.state.http = httpx.AsyncClient()
+
+        # Slow to import, so imported here rather than with the app, see PRELOAD_MODULES
+        from silicon.utils.cover.templater import Templater
+
+        app.state.templater = Templater()
+        app.state.cover_cache = CoverSheetCache(
+            COVER_CACHE_SIZE,
+            COVER_CACHE_DIR,
+            COVER_CACHE_MAX_BYTES,
+        )
+
+        # LaTeX builds and PDF merges block, so they run on their own threads off the event loop
+        app.state.render_pool = BoundedExecutor(
+            ThreadPoolExecutor(RENDER_POOL_WORKERS, thread_name_prefix="render"),
+            RENDER_POOL_WORKERS,
+        )
+        app.state.checkout_limiter = Limiter(CHECKOUT_CONCURRENCY, CHECKOUT_QUEUE_SIZE)
+
+        app.state.pdf_cache = DiskCache(SDS_PDF_CACHE_DIR, SDS_PDF_CACHE_MAX_BYTES)
+        app.state.sds_cache = LRUCache(SDS_CACHE_SIZE, SDS_CACHE_TTL)
+        app.state.search_cache = LRUCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+    with boot.phase("parse_pool"):
+        app.state.parse_pool = await create_parse_pool(
+            PARSE_POOL_WORKERS,
+            PARSE_POOL_MAX_TASKS_PER_CHILD,
+            PARSE_POOL_QUEUE_SIZE,
+        )
+
+    with boot.phase("s3"):
+        # Shared by every request, so connections to S3 are reused rather than set up for each
+        app.state.exit_stack = AsyncExitStack()
+        app.state.s3 = await app.state.exit_stack.enter_async_context(open_s3_client())
+
+    if STARTUP_WARM_UP:
+        with boot.phase("warm_up"):
+            await warm_up(app.state)
+
+    if MEILI_SYNC_ON_START:
+        app.state.meili_sync = asyncio.create_task(meili_sync(app.state))
+
+    app.state.background_tasks = [
+        asyncio.create_task(drain_search_outbox(app.state)),
+        asyncio.create_task(listen_for_sds_changes(app.state)),
+        *[asyncio.create_task(process_upload_jobs(app.state)) for _ in range(UPLOAD_JOB_WORKERS)],
+    ]
+
+    app.state.boot = boot.report()
+    log.info(f"Worker ready, boot took {app.state.boot}")
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    """Stops the background tasks, then closes the database connections, S3 client, HTTP client,
+    and render and parse pools."""
+    for task in app.state.background_tasks:
+        task.cancel()
+    await asyncio.gather(*app.state.background_tasks, return_exceptions=True)
+
+    await app.state.engine.dispose()
+    await app.state.exit_stack.aclose()
+    await app.state.meili.aclose()
+    app.state.render_pool.shutdown()
+    app.state.parse_pool.shutdown()
+
+
+@app.middleware("http")
+async def setup_request(request: Request, callnext: Callable) -> Response:
+    """Gets the S3 client, SDS PDF, record and search caches, HTTP client, templater, cover sheet
+    cache, render pool, checkout limiter, and parse pool for each request, and times it.
+
+    Routes that use the database open their session through the `get_db` dependency instead.
+    """
+    request.state.meili = app.state.meili
+    request.state.http = app.state.http
+    request.state.s3 = app.state.s3
+    request.state.pdf_cache = app.state.pdf_cache
+    request.state.sds_cache = app.state.sds_cache
+    request.state.search_cache = app.state.search_cache
+    request.state.templater = app.state.templater
+    request.state.cover_cache = app.state.cover_cache
+    request.state.render_pool = app.state.render_pool
+    request.state.checkout_limiter = app.state.checkout_limiter
+    request.state.parse_pool = app.state.parse_pool
+
+    start = time.perf_counter()
+    durations = start_stages()
+    response = await callnext(request)
+    total = time.perf_counter() - start
+
+    # Routing has filled in the endpoint by now, if any route matched
+    endpoint = request.scope.get("endpoint")
+    route = endpoint.__name__ if endpoint is not None else "unmatched"
+    observe_request(route, request.method, response.status_code, durations, total)
+    update_pool_gauges(app.state)
+    response.headers["Server-Timing"] = server_timing(durations, total)
+
+    return response
+
+
+# Added last so it runs first, and profiles the other middleware too
+app.add_middleware(ProfileMiddleware)
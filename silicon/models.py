@@ -1,14 +1,19 @@
 from sqlalchemy import (
     ARRAY,
-    JSON,
+    Boolean,
     Column,
     DateTime,
+    ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     UniqueConstraint,
+    false,
     func
 )
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import declarative_base, deferred
 
 Base = declarative_base()
 
@@ -17,19 +22,81 @@ class SafetyDataSheet(Base):
     __tablename__ = "safety_data_sheets"
     __table_args__ = (
         UniqueConstraint("product_name", "product_number", "product_brand", "cas_number"),
+        # Containment filters on the array columns when listing
+        Index("ix_safety_data_sheets_hazards", "hazards", postgresql_using="gin"),
+        Index("ix_safety_data_sheets_statements", "statements", postgresql_using="gin"),
+        # Keyset pagination by last update
+        Index("ix_safety_data_sheets_updated_at_id", "updated_at", "id"),
     )
     __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True)
     product_name = Column(String, nullable=False)
     product_number = Column(String, nullable=False)
-    product_brand = Column(String, nullable=False)
+    product_brand = Column(String, nullable=False, index=True)
     cas_number = Column(String, nullable=False)
     signal_word = Column(String, nullable=True)
     hazards = Column(ARRAY(String), nullable=False, server_default=r"{}")
     statements = Column(ARRAY(String), nullable=False, server_default=r"{}")
     pdf_download_url = Column(String, nullable=False)
-    data = Column(JSON, nullable=False)
+    content_hash = Column(String, nullable=True, index=True)
+    # Large, so only loaded by queries that ask for it
+    data = deferred(Column(JSONB, nullable=False))
+
+    # Derived from the fields above at upload time so checkout doesn't have to
+    latex_product_name = Column(String, nullable=True)
+    latex_cas_number = Column(String, nullable=True)
+    hazard_statement_overviews = Column(ARRAY(String), nullable=True)
+    page_count = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class UploadJob(Base):
+    __tablename__ = "upload_jobs"
+    __mapper_args__ = {"eager_defaults": True}
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False, server_default="pending", index=True)
+    filename = Column(String, nullable=True)
+    # The uploaded PDF, cleared once the job has been processed successfully
+    content = Column(LargeBinary, nullable=True)
+    force = Column(Boolean, nullable=False, server_default=false())
+    sds_id = Column(
+        Integer,
+        ForeignKey("safety_data_sheets.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    error = Column(String, nullable=True)
 
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now())
+
+
+class SyncState(Base):
+    """Progress of incremental syncs to other services, such as Meilisearch."""
+
+    __tablename__ = "sync_state"
+
+    name = Column(String, primary_key=True)
+    high_water_mark = Column(DateTime, nullable=True)
+
+    updated_at = Column(DateTime, server_default=func.now())
+
+
+class SearchOutbox(Base):
+    """SDS documents waiting to be sent to Meilisearch."""
+
+    __tablename__ = "search_outbox"
+
+    id = Column(Integer, primary_key=True)
+    sds_id = Column(
+        Integer,
+        ForeignKey("safety_data_sheets.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    attempts = Column(Integer, nullable=False, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)
+
+    created_at = Column(DateTime, server_default=func.now())
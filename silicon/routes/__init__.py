@@ -1,8 +1,11 @@
-from silicon.routes import healthcheck, sds
+from silicon.routes import healthcheck, metrics, profiles, sds, stats
 
 __all__ = ["routers"]
 
 routers = [
     healthcheck.router,
+    metrics.router,
+    profiles.router,
     sds.router,
+    stats.router,
 ]
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from silicon.utils.metrics import render_metrics, update_pool_gauges
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics(request: Request) -> Response:
+    update_pool_gauges(request.app.state)
+    # Already carries a charset, which `media_type` would add a second time
+    return Response(content=render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
@@ -0,0 +1,34 @@
+import io
+import pstats
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from silicon.utils.profiling import profile_path
+
+router = APIRouter(prefix="/profiles")
+
+
+@router.get("/{request_id}")
+async def get_profile(
+    request_id: UUID,
+    format: str = Query("pstats", regex="^(pstats|text)$"),
+    sort: str = Query("cumulative", regex="^(cumulative|tottime|ncalls)$"),
+    limit: int = Query(50, ge=1, le=1000),
+) -> Response:
+    """Gets the profile of a request, as a pstats file for tools like snakeviz, or as text."""
+    path = profile_path(request_id.hex)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "pstats":
+        return FileResponse(
+            path,
+            media_type="application/octet-stream",
+            filename=path.name,
+        )
+
+    text = io.StringIO()
+    pstats.Stats(str(path), stream=text).sort_stats(sort).print_stats(limit)
+    return PlainTextResponse(text.getvalue())
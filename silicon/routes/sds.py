@@ -1,41 +1,139 @@
 import asyncio
+import csv
 import json
-from concurrent.futures import ProcessPoolExecutor
-from datetime import date
-from functools import partial
-from io import BytesIO
-from typing import List, Literal
-from urllib.parse import quote, urljoin
-
-from botocore.handlers import validate_bucket_name
+import os
+import zlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import sha256
+from io import BytesIO, StringIO
+from typing import IO, TYPE_CHECKING, AsyncIterator, List, Literal
+from zipfile import BadZipFile, ZipFile
+
+from botocore.exceptions import ClientError
 from fastapi import (
     APIRouter,
+    Depends,
     HTTPException,
     Query,
     Request,
     Response,
     UploadFile
 )
-from httpx import AsyncClient
+from httpx import HTTPError
 from pydantic import BaseModel, validator
-from pylatexenc.latexencode import unicode_to_latex
-from sqlalchemy import func, literal_column, select
-from sqlalchemy.dialects.postgresql import insert
-from starlette.responses import StreamingResponse
-from tungsten import SigmaAldrichSdsParser
-from types_aiobotocore_s3.client import S3Client
-
-from silicon.constants import MEILI_INDEX_NAME, S3_BUCKET_NAME, S3_PUBLIC_URL
-from silicon.models import SafetyDataSheet
-from silicon.utils.cover.templater import (
-    HazardStatementOverview,
-    PaperType,
-    merge_pdf
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    case,
+    cast,
+    distinct,
+    func,
+    insert,
+    select,
+    true,
+    tuple_,
+    type_coerce
 )
-from silicon.utils.sds import get_sds_identifiers
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, undefer
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlalchemy.sql.expression import ScalarSelect, Select
+from starlette.responses import JSONResponse, StreamingResponse
+
+from silicon.constants import (
+    BULK_INSERT_CHUNK_SIZE,
+    BULK_ZIP_MAX_FILE_SIZE,
+    BULK_ZIP_MAX_FILES,
+    BULK_ZIP_MAX_TOTAL_SIZE,
+    CHECKOUT_FETCH_CONCURRENCY,
+    S3_UPLOAD_CONCURRENCY,
+    SDS_EXPORT_FETCH_SIZE,
+    SDS_LIST_MAX_PAGE_SIZE,
+    SDS_LIST_PAGE_SIZE,
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE
+)
+from silicon.models import SafetyDataSheet, UploadJob
+from silicon.utils.cache import CoverSheetCache, DiskCache, LRUCache
+from silicon.utils.db import get_db
+from silicon.utils.ingest import (
+    enqueue_search_documents,
+    find_sds_by_hash,
+    get_sds_pdf,
+    hash_content,
+    ingest_sds,
+    ingest_sds_stream,
+    notify_sds_changed,
+    put_sds_pdf,
+    sds_download_url,
+    sds_filename,
+    sds_key,
+    upsert_sds
+)
+from silicon.utils.metrics import stage
+from silicon.utils.pdf import iter_file, merge_pdfs
+from silicon.utils.pool import BoundedExecutor, Limiter, PoolFullError
+from silicon.utils.records import get_sds_records
+from silicon.utils.sds import (
+    get_hazard_statement_overviews,
+    parse_sds,
+    to_latex
+)
+from silicon.utils.search import search_sds_ids
+
+if TYPE_CHECKING:
+    from types_aiobotocore_s3.client import S3Client
 
 router = APIRouter(prefix="/sds")
 
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+# Fields that can be requested with the `fields` query parameter of the read endpoints
+SDS_FIELDS = frozenset(SafetyDataSheet.__table__.columns.keys())
+
+
+def sds_fields(fields: list[str] | None) -> set[str] | None:
+    """Validates the SDS fields requested through the `fields` query parameter, given either
+    repeated or comma separated. None means every field."""
+    if not fields:
+        return None
+
+    fields = {field.strip() for value in fields for field in value.split(",") if field.strip()}
+    unknown = fields - SDS_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return fields
+
+
+def sds_projection(fields: list[str] | None) -> LoaderOption:
+    """Builds the loader option for the requested SDS fields."""
+    fields = sds_fields(fields)
+    if fields is None:
+        return undefer(SafetyDataSheet.data)
+
+    # The id is always loaded, as the primary key
+    return load_only(*(getattr(SafetyDataSheet, field) for field in fields))
+
+
+def includes_data(fields: set[str] | None) -> bool:
+    """Whether the requested SDS fields include the large `data` column."""
+    return fields is None or "data" in fields
+
+
+def project_sds(sds: Row, fields: set[str] | None) -> dict:
+    """Picks the requested fields, and the id, out of a whole SDS row."""
+    if fields is None:
+        return dict(sds)
+    return {"id": sds.id, **{field: sds[field] for field in fields}}
+
 
 class CheckoutItem(BaseModel):
     sds_id: int
@@ -67,125 +165,595 @@ class Checkout(BaseModel):
         return items
 
 
-def parse_sds(content):
-    sds_parser = SigmaAldrichSdsParser()
-    parsed_sds = sds_parser.parse_to_ghs_sds(BytesIO(content))
-    return json.loads(parsed_sds.dumps())
+def select_checkout_rows(percentages: dict[int, float]) -> Select:
+    """Selects what a checkout needs of each SDS, in the order given, with its percentage.
+
+    Every row also carries the union of the pictograms and hazard statement overviews of all the
+    SDS documents, and the most severe signal word among them, so they are computed by Postgres
+    rather than by sending every document's codes over.
+    """
+    sds = SafetyDataSheet.__table__
+    items = func.unnest(
+        cast(list(percentages), ARRAY(Integer)),
+        cast(list(percentages.values()), ARRAY(Float)),
+    ).table_valued("sds_id", "percentage", with_ordinality="position") \
+        .render_derived("items")
+    rows = select(
+        items.c.position,
+        items.c.percentage,
+        sds.c.id,
+        sds.c.product_brand,
+        sds.c.product_number,
+        sds.c.content_hash,
+        sds.c.product_name,
+        sds.c.cas_number,
+        sds.c.latex_product_name,
+        sds.c.latex_cas_number,
+        sds.c.signal_word,
+        sds.c.hazards,
+        sds.c.statements,
+        sds.c.hazard_statement_overviews,
+    ).join_from(items, sds, sds.c.id == items.c.sds_id).cte("checkout_rows")
+
+    def union(column) -> ScalarSelect:
+        # Sorted by code point like Python does, so identical checkouts have identical cover
+        # sheet cache keys
+        codes = func.unnest(column).table_valued("code").render_derived().lateral("codes")
+        code = codes.c.code.collate("C")
+        return select(func.array_agg(aggregate_order_by(distinct(code), code))) \
+            .select_from(rows.join(codes, true())) \
+            .correlate(None) \
+            .scalar_subquery()
+
+    signal_word = select(case(
+        (func.bool_or(rows.c.signal_word == "Danger"), "DANGER"),
+        (func.bool_or(rows.c.signal_word == "Warning"), "WARNING"),
+    )).correlate(None).scalar_subquery()
+
+    return select(
+        rows.c.id,
+        rows.c.product_brand,
+        rows.c.product_number,
+        rows.c.content_hash,
+        rows.c.product_name,
+        rows.c.cas_number,
+        rows.c.latex_product_name,
+        rows.c.latex_cas_number,
+        rows.c.percentage,
+        union(rows.c.hazards).label("pictograms"),
+        union(rows.c.hazard_statement_overviews).label("hazard_statement_overviews"),
+        signal_word.label("signal_word"),
+        # Only needed, to derive the overviews from, for SDS documents not backfilled yet
+        case(
+            (rows.c.hazard_statement_overviews.is_(None), rows.c.statements),
+        ).label("statements"),
+    ).order_by(rows.c.position)
 
 
 @router.post("/")
-async def upload_sds(request: Request, file: UploadFile) -> Response:
-    db = request.state.db
-    s3: S3Client = request.state.s3
-    meili = request.state.meili
-    loop = asyncio.get_running_loop()
-
-    content = await file.read()
-
-    with ProcessPoolExecutor() as pool:
-        run_in_executor = partial(loop.run_in_executor, pool)
+async def upload_sds(
+    request: Request,
+    file: UploadFile,
+    force: bool = False,
+    background: bool = False,
+    pipelined: bool = False,
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Uploads an SDS PDF.
+
+    With `background` set, the PDF is queued as an upload job and a 202 response with the job
+    id is returned straight away. The job's progress is available from `/sds/jobs/{job_id}`.
+
+    With `pipelined` set, the PDF is uploaded to S3 while it is being parsed instead of
+    afterwards, and never held in memory as a whole.
+    """
+    if background:
+        content = await file.read()
+        async with db.begin():
+            stmt = insert(UploadJob) \
+                .values(filename=file.filename, content=content, force=force) \
+                .returning(UploadJob.id, UploadJob.status)
+            job = (await db.execute(stmt)).fetchone()
+
+        return JSONResponse(
+            status_code=202,
+            content=dict(job),
+            headers={"Location": str(request.url_for("get_upload_job", job_id=job.id))},
+        )
 
-        sds_json = await run_in_executor(parse_sds, content)
-        product_identifiers = await run_in_executor(get_sds_identifiers, sds_json)
+    pipeline = {
+        "db": db,
+        "s3": request.state.s3,
+        "parse_pool": request.state.parse_pool,
+        "force": force,
+    }
+    try:
+        if pipelined:
+            sds = await ingest_sds_stream(file.file, **pipeline)
+        else:
+            sds = await ingest_sds(await file.read(), **pipeline)
+    except PoolFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many SDS uploads are being parsed, try again later",
+            headers={"Retry-After": "5"},
+        )
 
-    filename = (
-        f"Sigma_Aldrich_{product_identifiers['product_brand']}"
-        f"_{product_identifiers['product_number']}.pdf"
-    )
+    return dict(sds)
 
-    async with s3() as client:
-        client: S3Client
 
-        # Disable bucket name validation to support Ceph RGW tenancy
-        client.meta.events.unregister("before-parameter-build.s3", validate_bucket_name)
+def read_zip_pdfs(archive_name: str, content: bytes) -> tuple[list[tuple[str, bytes]], list[dict]]:
+    """Extracts the PDFs from a ZIP archive, returning them and the failed results of those past
+    the `BULK_ZIP_MAX_*` limits.
+
+    The limits are checked against the uncompressed sizes recorded in the archive, which
+    `zipfile` never decompresses past.
+    """
+    documents: list[tuple[str, bytes]] = []
+    failed: list[dict] = []
+    total_size = 0
+    with ZipFile(BytesIO(content)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() \
+                    or not info.filename.lower().endswith(".pdf") \
+                    or info.filename.startswith("__MACOSX/"):
+                continue
+
+            filename = f"{archive_name}/{info.filename}"
+            if len(documents) >= BULK_ZIP_MAX_FILES:
+                error = f"More than {BULK_ZIP_MAX_FILES} PDFs in the ZIP archive"
+            elif info.file_size > BULK_ZIP_MAX_FILE_SIZE:
+                error = f"Larger than {BULK_ZIP_MAX_FILE_SIZE} bytes uncompressed"
+            elif total_size + info.file_size > BULK_ZIP_MAX_TOTAL_SIZE:
+                error = f"ZIP archive larger than {BULK_ZIP_MAX_TOTAL_SIZE} bytes uncompressed"
+            else:
+                documents.append((filename, archive.read(info)))
+                total_size += info.file_size
+                continue
+            failed.append({"filename": filename, "status": "failed", "error": error})
+
+    return documents, failed
+
+
+@router.post("/bulk")
+async def upload_bulk_sds(
+    request: Request,
+    files: list[UploadFile],
+    force: bool = False,
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Ingests many SDS PDFs at once, given as PDF files and/or ZIP archives of PDF files."""
+    s3 = request.state.s3
+    parse_pool: BoundedExecutor = request.state.parse_pool
+
+    documents: list[tuple[str, bytes]] = []
+    results: list[dict] = []
+    for file in files:
+        content = await file.read()
+        if file.content_type in ZIP_CONTENT_TYPES or file.filename.lower().endswith(".zip"):
+            try:
+                pdfs, failed = read_zip_pdfs(file.filename, content)
+            except BadZipFile:
+                results.append({
+                    "filename": file.filename,
+                    "status": "failed",
+                    "error": "Not a valid ZIP archive",
+                })
+            else:
+                documents.extend(pdfs)
+                results.extend(failed)
+        else:
+            documents.append((file.filename, content))
+
+    # Identical files are only parsed once, and already ingested ones are not parsed at all
+    files_by_hash: dict[str, list[str]] = {}
+    contents: dict[str, bytes] = {}
+    for filename, content in documents:
+        content_hash = hash_content(content)
+        files_by_hash.setdefault(content_hash, []).append(filename)
+        contents[content_hash] = content
+
+    existing = {}
+    if not force and files_by_hash:
+        async with db.begin():
+            existing = await find_sds_by_hash(db, list(files_by_hash))
+
+    for content_hash, sds in existing.items():
+        results.extend(
+            {"filename": filename, "status": "duplicate", "id": sds.id}
+            for filename in files_by_hash.pop(content_hash)
+        )
 
-        await client.put_object(
-            ACL="public-read",
-            Bucket=S3_BUCKET_NAME,
-            Body=content,
-            Key=filename,
+    parse_hashes = list(files_by_hash)
+    with stage("parse"):
+        parsed = await asyncio.gather(
+            *(parse_pool.run(parse_sds, contents[content_hash], wait=True)
+              for content_hash in parse_hashes),
+            return_exceptions=True,
         )
 
-    pdf_download_url = urljoin(S3_PUBLIC_URL, quote(f"{S3_BUCKET_NAME}/{filename}"))
-    async with db.begin():
-        stmt = insert(SafetyDataSheet) \
-            .values(
-            data=sds_json,
-            pdf_download_url=pdf_download_url,
-            **product_identifiers,
-        ) \
-            .on_conflict_do_update(
-            index_elements=[
-                SafetyDataSheet.product_name,
-                SafetyDataSheet.product_brand,
-                SafetyDataSheet.product_number,
-                SafetyDataSheet.cas_number,
-            ],
-            set_={
-                "data": sds_json,
-                "pdf_download_url": pdf_download_url,
-                "signal_word": product_identifiers["signal_word"],
-                "hazards": product_identifiers["hazards"],
-                "statements": product_identifiers["statements"]
-            },
-        ) \
-            .returning(literal_column("*"))
+    def report(content_hash: str, status: str, **details) -> None:
+        results.extend(
+            {"filename": filename, "status": status, **details}
+            for filename in files_by_hash.pop(content_hash)
+        )
 
-        result = await db.execute(stmt)
+    # When several files describe the same SDS, the last one given wins
+    hash_by_key: dict[tuple, str] = {}
+    parsed_by_hash: dict[str, tuple[dict, dict, dict]] = {}
+    for content_hash, outcome in zip(parse_hashes, parsed):
+        if isinstance(outcome, Exception):
+            report(content_hash, "failed", error=str(outcome) or repr(outcome))
+            continue
+        parsed_by_hash[content_hash] = outcome
+        hash_by_key[sds_key(outcome[1])] = content_hash
+
+    s3_slots = asyncio.Semaphore(S3_UPLOAD_CONCURRENCY)
+
+    async def upload(client: "S3Client", content_hash: str) -> None:
+        product_identifiers = parsed_by_hash[content_hash][1]
+        filename = sds_filename(
+            product_identifiers["product_brand"],
+            product_identifiers["product_number"],
+        )
+        async with s3_slots:
+            await put_sds_pdf(client, filename, contents[content_hash])
+
+    upload_hashes = list(hash_by_key.values())
+    with stage("s3_put"):
+        uploaded = await asyncio.gather(
+            *(upload(s3, content_hash) for content_hash in upload_hashes),
+            return_exceptions=True,
+        )
 
-    sds = result.fetchone()
-    await meili.post(
-        f"indexes/{MEILI_INDEX_NAME}/documents",
-        json={
-            "id": sds.id,
+    values: list[dict] = []
+    for content_hash, outcome in zip(upload_hashes, uploaded):
+        if isinstance(outcome, Exception):
+            report(content_hash, "failed", error=str(outcome) or repr(outcome))
+            continue
+
+        sds_json, product_identifiers, checkout_fields = parsed_by_hash[content_hash]
+        values.append({
+            "data": sds_json,
+            "pdf_download_url": sds_download_url(sds_filename(
+                product_identifiers["product_brand"],
+                product_identifiers["product_number"],
+            )),
+            "content_hash": content_hash,
             **product_identifiers,
-        },
-    )
+            **checkout_fields,
+        })
 
-    return dict(sds)
+    rows: list[Row] = []
+    if values:
+        with stage("db_upsert"):
+            async with db.begin():
+                for offset in range(0, len(values), BULK_INSERT_CHUNK_SIZE):
+                    stmt = upsert_sds(values[offset:offset + BULK_INSERT_CHUNK_SIZE])
+                    rows.extend((await db.execute(stmt)).fetchall())
+
+                await enqueue_search_documents(db, [sds.id for sds in rows])
+                await notify_sds_changed(db, [sds.id for sds in rows])
+
+    for sds in rows:
+        report(sds.content_hash, "ingested", id=sds.id)
+
+    # Whatever is left was parsed fine but lost out to a later file for the same SDS
+    for content_hash in list(files_by_hash):
+        report(content_hash, "superseded")
+
+    return {"results": results}
+
+
+def encode_cursor(sds: Row, order_by: str) -> str:
+    key = [sds.id] if order_by == "id" else [sds.updated_at.isoformat(), sds.id]
+    return urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str, order_by: str) -> list:
+    try:
+        key = json.loads(urlsafe_b64decode(cursor.encode()))
+        if order_by == "id":
+            (sds_id,) = key
+            return [int(sds_id)]
+        updated_at, sds_id = key
+        return [datetime.fromisoformat(updated_at), int(sds_id)]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+
+@router.get("/")
+async def list_sds(
+    signal_word: str | None = None,
+    brand: str | None = None,
+    hazards: list[str] = Query([]),
+    statements: list[str] = Query([]),
+    order_by: Literal["id", "updated_at"] = "id",
+    cursor: str | None = None,
+    limit: int = Query(SDS_LIST_PAGE_SIZE, ge=1, le=SDS_LIST_MAX_PAGE_SIZE),
+    fields: list[str] | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Lists SDS documents a page at a time, optionally filtered. Documents must have every
+    requested hazard pictogram and statement code.
+
+    Pages are ordered by `order_by` and continue from the `next_cursor` of the previous page, so
+    documents aren't skipped or repeated when others are added in the meantime.
+    """
+    if order_by == "id":
+        key = (SafetyDataSheet.id,)
+    else:
+        key = (SafetyDataSheet.updated_at, SafetyDataSheet.id)
+
+    # The parsed SDS data is only loaded if explicitly requested, as listings rarely need it. The
+    # key columns are selected alongside for the cursor, whichever fields are requested.
+    stmt = select(SafetyDataSheet, *key)
+    if fields:
+        stmt = stmt.options(sds_projection(fields))
+
+    if signal_word is not None:
+        stmt = stmt.where(SafetyDataSheet.signal_word == signal_word)
+    if brand is not None:
+        stmt = stmt.where(SafetyDataSheet.product_brand == brand)
+    # Containment on the Postgres array type, so the GIN indexes are used
+    if hazards:
+        stmt = stmt.where(type_coerce(SafetyDataSheet.hazards, ARRAY(String)).contains(hazards))
+    if statements:
+        stmt = stmt.where(
+            type_coerce(SafetyDataSheet.statements, ARRAY(String)).contains(statements)
+        )
 
+    if cursor is not None:
+        stmt = stmt.where(tuple_(*key) > tuple_(*decode_cursor(cursor, order_by)))
 
-@router.get("/batch")
-async def get_batch_sds(request: Request, sds_ids: list[int] = Query()) -> Response:
-    db = request.state.db
+    # One extra row tells us whether there is a next page
+    stmt = stmt.order_by(*key).limit(limit + 1)
 
     async with db.begin():
-        stmt = select(SafetyDataSheet).where(SafetyDataSheet.id == func.any(sds_ids))
         result = await db.execute(stmt)
 
-    return [sds["SafetyDataSheet"] for sds in result.fetchall()]
+    rows = result.all()
+    next_cursor = encode_cursor(rows[limit - 1], order_by) if len(rows) > limit else None
+
+    return {"items": [row.SafetyDataSheet for row in rows[:limit]], "next_cursor": next_cursor}
+
+
+@router.get("/search")
+async def search_sds(
+    request: Request,
+    q: str = "",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    fields: list[str] | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Searches SDS documents, returning them in ranking order.
+
+    Only the ids of the hits come from Meilisearch, the documents themselves are read from the
+    database so they are never stale. Hits for documents that no longer exist are left out.
+    """
+    fields = sds_fields(fields)
+
+    # Meilisearch ignores case and extra whitespace, so the cache does too
+    search_cache: LRUCache = request.state.search_cache
+    key = (" ".join(q.lower().split()), offset, limit)
+    hits = search_cache.get(key)
+    if hits is None:
+        try:
+            hits = await search_sds_ids(request.state.meili, q, offset, limit)
+        except HTTPError:
+            raise HTTPException(status_code=502, detail="Search is unavailable")
+        search_cache.put(key, hits)
+    sds_ids, estimated_total_hits = hits
+
+    # Only the requested columns of the hits, in one query, put back in ranking order after
+    sds = SafetyDataSheet.__table__
+    records: dict[int, Row] = {}
+    if sds_ids:
+        columns = [sds] if fields is None \
+            else [sds.c.id, *(sds.c[field] for field in fields - {"id"})]
+        with stage("db_read"):
+            async with db.begin():
+                stmt = select(*columns).where(sds.c.id == func.any(sds_ids))
+                records = {record.id: record for record in await db.execute(stmt)}
+
+    return {
+        "hits": [dict(records[sds_id]) for sds_id in sds_ids if sds_id in records],
+        "estimated_total_hits": estimated_total_hits,
+        "offset": offset,
+        "limit": limit,
+    }
+
+
+# Media type of each export format
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_json(value: object) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def export_csv_value(value: object) -> object:
+    """Formats a value for a CSV cell, with arrays and the parsed SDS data as JSON."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def encode_export(rows: list[Row], columns: list[str], format: str) -> str:
+    if format == "ndjson":
+        return "".join(json.dumps(dict(sds), default=export_json) + "\n" for sds in rows)
+
+    text = StringIO()
+    writer = csv.writer(text)
+    writer.writerows([export_csv_value(sds[column]) for column in columns] for sds in rows)
+    return text.getvalue()
+
+
+def accepts_gzip(request: Request) -> bool:
+    for encoding in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = encoding.partition(";")
+        if name.strip() == "gzip" and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return True
+    return False
+
+
+@router.get("/export")
+async def export_sds(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fields: list[str] | None = Query(None),
+    updated_since: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Exports every SDS document, or those updated since `updated_since`, ordered by id.
+
+    Rows are streamed from a server-side cursor as they are fetched, so memory use doesn't grow
+    with the size of the table. The export reads a consistent snapshot of the table. It is
+    gzipped if the client accepts it.
+    """
+    fields = sds_fields(fields)
+    columns = [
+        column for column in SafetyDataSheet.__table__.columns.keys()
+        if fields is None or column in fields or column == "id"
+    ]
+
+    stmt = select(*(SafetyDataSheet.__table__.c[column] for column in columns)) \
+        .order_by(SafetyDataSheet.id) \
+        .execution_options(yield_per=SDS_EXPORT_FETCH_SIZE)
+    if updated_since is not None:
+        # Timestamps are stored in UTC, without a time zone
+        if updated_since.tzinfo is not None:
+            updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+        stmt = stmt.where(SafetyDataSheet.updated_at >= updated_since)
+
+    gzip = accepts_gzip(request)
+
+    async def iter_export() -> AsyncIterator[bytes]:
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if gzip else None
+
+        def encode(text: str) -> bytes:
+            content = text.encode()
+            return compressor.compress(content) if compressor is not None else content
+
+        if format == "csv":
+            yield encode(",".join(columns) + "\r\n")
+
+        async with db.begin():
+            result = await db.stream(stmt)
+            async for rows in result.partitions():
+                content = encode(encode_export(rows, columns, format))
+                if content:
+                    yield content
+
+        if compressor is not None:
+            yield compressor.flush()
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="sds-export.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(iter_export(), media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
+def sds_validators(versions: list[Row], fields: list[str] | None) -> dict[str, str]:
+    """Builds the ETag and Last-Modified headers for a response made up of the given SDS
+    documents, from the `id` and `updated_at` of each. The ETag also covers the requested fields,
+    as they change the response."""
+    tag = sha256(json.dumps([
+        sorted([sds.id, sds.updated_at.isoformat()] for sds in versions),
+        sorted(fields or ()),
+    ]).encode()).hexdigest()[:32]
+    last_modified = max(sds.updated_at for sds in versions).replace(tzinfo=timezone.utc)
+    return {"ETag": f'"{tag}"', "Last-Modified": format_datetime(last_modified, usegmt=True)}
+
+
+def is_not_modified(request: Request, validators: dict[str, str]) -> bool:
+    """Evaluates the conditional request headers against the response validators.
+    `If-Modified-Since` is ignored if `If-None-Match` is given."""
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or validators["ETag"] in tags
+
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # The asctime form and a `-0000` zone parse without a time zone, HTTP dates are in GMT
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # Last-Modified only has second precision
+        return parsedate_to_datetime(validators["Last-Modified"]) <= since
+
+    return False
 
 
-@router.post("/checkout")
-async def post_checkout_sds(request: Request, req_payload: Checkout) -> Response:
-    db = request.state.db
-
-    async with db.begin():
-        stmt = select(SafetyDataSheet) \
-            .where(SafetyDataSheet.id == func.any([item.sds_id for item in req_payload.items]))
-        result = await db.execute(stmt)
-
-    db_data: list[SafetyDataSheet] = [sds['SafetyDataSheet'] for sds in result.fetchall()]
-    entries: list[dict] = []
+@router.get("/batch")
+async def get_batch_sds(
+    request: Request,
+    response: Response,
+    sds_ids: list[int] = Query(),
+    fields: list[str] | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Gets many SDS documents at once. Supports conditional requests, so that pollers can skip
+    transferring documents that haven't changed."""
+    fields = sds_fields(fields)
+    records = await get_sds_records(db, request.state.sds_cache, sds_ids)
+    if records:
+        validators = sds_validators(list(records.values()), fields)
+        if is_not_modified(request, validators):
+            return Response(status_code=304, headers=validators)
+
+        # Only read once it's known to be needed, as it's much larger than the rest of a row
+        if includes_data(fields):
+            records = await get_sds_records(db, request.state.sds_cache, sds_ids, with_data=True)
+            validators = sds_validators(list(records.values()), fields) if records else {}
+        response.headers.update(validators)
+
+    return [project_sds(sds, fields) for sds in records.values()]
 
-    signal_words: set[str] = {sds.signal_word for sds in db_data}
 
-    cent_map = {item.sds_id: item.percentage for item in req_payload.items}
+@router.post("/checkout")
+async def post_checkout_sds(
+    request: Request,
+    req_payload: Checkout,
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    from silicon.utils.cover.templater import PaperType
+
+    # An SDS given more than once keeps its first place and its last percentage
+    percentages = {item.sds_id: item.percentage for item in req_payload.items}
+    with stage("db_read"):
+        async with db.begin():
+            result = await db.execute(select_checkout_rows(percentages))
+    db_data: list[Row] = result.fetchall()
+
+    # The aggregates are the same on every row. They are sorted again here as the cover sheet
+    # cache key depends on their order, which must not rest on how the query happens to build them.
+    signal_word = db_data[0].signal_word if db_data else None
+    all_pictograms: list[str] = sorted(db_data[0].pictograms or []) if db_data else []
+    statements = set(db_data[0].hazard_statement_overviews or []) if db_data else set()
+    # SDS documents that haven't been backfilled yet have no overviews stored to aggregate
     for sds in db_data:
-        entries.append({
-            'sds': sds,
-            'percentage': cent_map[sds.id],
-        })
-
-    all_pictograms: list[str] = [*{hazard for sds in db_data for hazard in sds.hazards}]
-    all_statements: list[str] = [overview.name for overview in {
-        *HazardStatementOverview.get_statements([*{statement
-                                                   for sds in db_data
-                                                   for statement in sds.statements}])}]
+        if sds.statements is not None:
+            statements.update(get_hazard_statement_overviews(sds.statements))
+    all_statements: list[str] = sorted(statements)
 
     templater = request.state.templater
+    cover_cache: CoverSheetCache = request.state.cover_cache
 
-    front_page = templater.generate_pdf({
+    cover_context = {
         'paper': PaperType.A4_PAPER.value,
         'cover_title': "Cover Sheet — U.S. Origin Shipments",
         'sensitivity': req_payload.sensitivity.strip().lower().capitalize(),
@@ -197,41 +765,133 @@ async def post_checkout_sds(request: Request, req_payload: Checkout) -> Response
             "CAS No.",
             f"{req_payload.measurement_type.capitalize()} \\%"
         ],
-        'signal_word': "DANGER" if "Danger" in signal_words
-        else "WARNING" if "Warning" in signal_words else None,
+        'signal_word': signal_word,
         'rows': [
             [
-                unicode_to_latex(entry['sds'].product_name),
-                unicode_to_latex(entry['sds'].cas_number),
-                f'{entry["percentage"]}\\%',
-            ] for entry in entries
+                # Not backfilled yet for SDS documents ingested before they were precomputed
+                sds.latex_product_name or to_latex(sds.product_name),
+                sds.latex_cas_number or to_latex(sds.cas_number),
+                f'{sds.percentage}\\%',
+            ] for sds in db_data
         ],
         'pictograms': all_pictograms,
         'hazard_statement_overview': all_statements,
         'signature_date': req_payload.certification_date.strftime('%B %d, %Y'),
-    })
-
-    http: AsyncClient = request.state.http
-    files = [front_page]
-    for sds in db_data:
-        response = await http.get(url=sds.pdf_download_url)
-        files.append(BytesIO(response.content))
-    merged = merge_pdf(files)
+    }
+
+    checkout_limiter: Limiter = request.state.checkout_limiter
+    render_pool: BoundedExecutor = request.state.render_pool
+    pdf_cache: DiskCache = request.state.pdf_cache
+
+    try:
+        with stage("queue"):
+            await checkout_limiter.acquire()
+    except PoolFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many checkouts are being rendered, try again later",
+            headers={"Retry-After": "5"},
+        )
 
+    try:
+        # Identical checkouts render identical cover sheets, so skip the LaTeX build for repeats
+        cover_sheet = cover_cache.get(cover_context)
+        if cover_sheet is None:
+            with stage("render"):
+                rendered = await render_pool.run(templater.generate_pdf, cover_context, wait=True)
+                rendered.seek(0)
+                cover_sheet = rendered.read()
+            cover_cache.put(cover_context, cover_sheet)
+        front_page = BytesIO(cover_sheet)
+
+        fetch_slots = asyncio.Semaphore(CHECKOUT_FETCH_CONCURRENCY)
+
+        async def fetch(client: "S3Client", sds: Row) -> IO[bytes]:
+            filename = sds_filename(sds.product_brand, sds.product_number)
+            try:
+                async with fetch_slots:
+                    return await get_sds_pdf(client, filename, sds.content_hash, pdf_cache)
+            except ClientError:
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Failed to fetch the PDF of SDS {sds.id}",
+                )
+
+        # The SDS PDFs are read straight from the disk cache rather than loaded into memory
+        with stage("fetch_pdfs"):
+            fetched = await asyncio.gather(
+                *(fetch(request.state.s3, sds) for sds in db_data),
+                return_exceptions=True,
+            )
+        files = [front_page, *(file for file in fetched if not isinstance(file, BaseException))]
+        try:
+            for file in fetched:
+                if isinstance(file, BaseException):
+                    raise file
+            with stage("merge"):
+                merged = await render_pool.run(merge_pdfs, files, wait=True)
+        finally:
+            for file in files:
+                file.close()
+    finally:
+        checkout_limiter.release()
+
+    size = merged.seek(0, os.SEEK_END)
     merged.seek(0)
 
-    return StreamingResponse(content=merged, media_type='application/pdf')
-
+    return StreamingResponse(
+        content=iter_file(merged),
+        media_type='application/pdf',
+        headers={"Content-Length": str(size)},
+    )
 
-@router.get("/{sds_id}")
-async def get_sds(request: Request, sds_id: int) -> Response:
-    db = request.state.db
 
+@router.get("/jobs/{job_id}")
+async def get_upload_job(job_id: int, db: AsyncSession = Depends(get_db)) -> Response:
     async with db.begin():
-        stmt = select(SafetyDataSheet).where(SafetyDataSheet.id == sds_id)
+        stmt = select(
+            UploadJob.id,
+            UploadJob.status,
+            UploadJob.filename,
+            UploadJob.sds_id,
+            UploadJob.error,
+            UploadJob.created_at,
+            UploadJob.updated_at,
+        ).where(UploadJob.id == job_id)
         result = (await db.execute(stmt)).fetchone()
 
     if not result:
-        raise HTTPException(status_code=404, detail="SDS not found")
+        raise HTTPException(status_code=404, detail="Upload job not found")
 
     return dict(result)
+
+
+@router.get("/{sds_id}")
+async def get_sds(
+    request: Request,
+    response: Response,
+    sds_id: int,
+    fields: list[str] | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Gets an SDS document. Supports conditional requests, so that pollers can skip transferring
+    it when it hasn't changed."""
+    fields = sds_fields(fields)
+    sds = (await get_sds_records(db, request.state.sds_cache, [sds_id])).get(sds_id)
+    if sds is None:
+        raise HTTPException(status_code=404, detail="SDS not found")
+
+    validators = sds_validators([sds], fields)
+    if is_not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    # Only read once it's known to be needed, as it's much larger than the rest of the row
+    if includes_data(fields):
+        records = await get_sds_records(db, request.state.sds_cache, [sds_id], with_data=True)
+        sds = records.get(sds_id)
+        if sds is None:
+            raise HTTPException(status_code=404, detail="SDS not found")
+        validators = sds_validators([sds], fields)
+    response.headers.update(validators)
+
+    return {"SafetyDataSheet": project_sds(sds, fields)}
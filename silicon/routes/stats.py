@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Request, Response
+
+from silicon.utils.search import get_search_outbox_backlog
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def stats(request: Request) -> Response:
+    state = request.app.state
+    return {
+        "boot": state.boot,
+        "database_pool": state.engine.sync_engine.pool.stats(),
+        "parse_pool": {
+            "pending": state.parse_pool.pending,
+            "max_pending": state.parse_pool.max_pending,
+        },
+        "checkouts": {
+            "running": state.checkout_limiter.running,
+            "waiting": state.checkout_limiter.waiting,
+        },
+        "search_outbox": await get_search_outbox_backlog(state),
+        "cover_cache": state.cover_cache.stats(),
+        "sds_pdf_cache": state.pdf_cache.stats(),
+        "sds_cache": state.sds_cache.stats(),
+        "search_cache": state.search_cache.stats(),
+    }
@@ -0,0 +1,78 @@
+"""Worker boot timing, and the warm-up that gets a worker ready before it serves any requests."""
+import asyncio
+import importlib
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import text
+
+from silicon.constants import DATABASE_POOL_SIZE, RENDER_POOL_WORKERS
+from silicon.utils.metrics import BOOT_DURATION
+from silicon.utils.pdf import warm_up as warm_up_render_thread
+
+# Imported on first use rather than along with the app, but needed by every worker. With
+# `preload_app`, gunicorn imports them before forking so workers share them, see gunicorn_conf.py.
+PRELOAD_MODULES = [
+    "aiobotocore.session",
+    "aiobotocore.client",
+    "PyPDF2",
+    "silicon.utils.cover.templater",
+]
+
+# Set by gunicorn_conf.py in each worker as it is forked, as a Unix timestamp
+WORKER_STARTED_AT_ENV = "SILICON_WORKER_STARTED_AT"
+
+
+def preload_modules() -> None:
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+
+
+class BootTimer:
+    """Times the phases of a worker's startup."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def report(self) -> dict[str, float]:
+        """Reports how long each phase took, and the startup as a whole, in seconds.
+
+        Under gunicorn, `load` is the time between the worker being forked and its startup,
+        mostly spent importing the app unless it was preloaded, and `total` includes it.
+        """
+        report = {**self.phases, "startup": time.perf_counter() - self.started}
+        started_at = os.environ.get(WORKER_STARTED_AT_ENV)
+        if started_at is not None:
+            total = time.time() - float(started_at)
+            report["load"] = total - report["startup"]
+            report["total"] = total
+
+        for phase, duration in report.items():
+            BOOT_DURATION.labels(phase).observe(duration)
+        return {phase: round(duration, 3) for phase, duration in report.items()}
+
+
+async def warm_up(state) -> None:
+    """Opens the database pool's connections, starts the render pool's threads, and imports the
+    modules that would otherwise be imported by the first requests to need them."""
+    async def connect() -> None:
+        async with state.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    preload_modules()
+    await asyncio.gather(
+        *(connect() for _ in range(DATABASE_POOL_SIZE)),
+        *(state.render_pool.run(warm_up_render_thread, wait=True)
+          for _ in range(RENDER_POOL_WORKERS)),
+    )
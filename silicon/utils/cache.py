@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import IO, Any, Hashable
+
+
+class LRUCache:
+    """An in-memory cache holding up to `max_size` entries, evicting the least recently used.
+
+    With `ttl` set, entries also expire that many seconds after they were put.
+    """
+
+    def __init__(self, max_size: int, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped on every invalidation, see `put`
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+            del self.entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, invalidations: int | None = None) -> None:
+        """Adds an entry to the cache.
+
+        Pass the `invalidations` count from before the value was loaded to skip caching it if
+        the cache was invalidated in the meantime, as the value may already be stale.
+        """
+        if self.max_size <= 0 or invalidations not in (None, self.invalidations):
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self.invalidations += 1
+        self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.invalidations += 1
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class DiskCache:
+    """A cache of files in a directory capped at `max_bytes`, evicting the least recently used.
+
+    The directory may be shared by several processes, entries are written atomically.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.size = sum(
+            path.stat().st_size
+            for path in self.directory.iterdir()
+            if not path.name.startswith(".")
+        )
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key: str) -> Path:
+        return self.directory / hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> Path | None:
+        """Returns the path of the cached file, or None if it is not cached."""
+        path = self.path(key)
+        try:
+            # Bump the modification time, which eviction uses to find the least recently used
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return path
+
+    def put(self, key: str, content: bytes) -> Path:
+        with self.create() as file:
+            file.write(content)
+            return self.commit(key, file)
+
+    def create(self) -> IO[bytes]:
+        """Creates a temporary file to be written and then added to the cache with `commit`."""
+        return NamedTemporaryFile(dir=self.directory, prefix=".", delete=False)
+
+    def commit(self, key: str, file: IO[bytes]) -> Path:
+        """Adds a file written after `create` to the cache.
+
+        The file stays open and readable, even if it is evicted again in the meantime.
+        """
+        file.flush()
+        path = self.path(key)
+        os.replace(file.name, path)
+
+        self.size += file.tell()
+        if self.size > self.max_bytes:
+            self.evict()
+        return path
+
+    def discard(self, file: IO[bytes]) -> None:
+        """Removes a file from `create` that will not be committed."""
+        file.close()
+        Path(file.name).unlink(missing_ok=True)
+
+    def invalidate(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def evict(self) -> None:
+        """Removes the least recently used files until the cache fits in `max_bytes`."""
+        files = []
+        for path in self.directory.iterdir():
+            # Skip files that are still being written
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()
+        self.size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self.size -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CoverSheetCache:
+    """Rendered cover sheets keyed by their template context, kept in memory and on disk."""
+
+    def __init__(self, max_entries: int, directory: str, max_bytes: int):
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(directory, max_bytes)
+
+    @staticmethod
+    def key(context: dict) -> str:
+        return hashlib.sha256(
+            json.dumps(context, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def get(self, context: dict) -> bytes | None:
+        key = self.key(context)
+        cover_sheet = self.memory.get(key)
+        if cover_sheet is None:
+            path = self.disk.get(key)
+            if path is None:
+                return None
+            try:
+                cover_sheet = path.read_bytes()
+            except FileNotFoundError:
+                # Evicted by another process in the meantime
+                return None
+            self.memory.put(key, cover_sheet)
+        return cover_sheet
+
+    def put(self, context: dict, cover_sheet: bytes) -> None:
+        key = self.key(context)
+        self.memory.put(key, cover_sheet)
+        self.disk.put(key, cover_sheet)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.memory.hits + self.disk.hits,
+            "misses": self.disk.misses,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats(),
+        }
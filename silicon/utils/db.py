@@ -0,0 +1,81 @@
+import time
+from typing import AsyncIterator
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from silicon.constants import (
+    DATABASE_ECHO,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_PRE_PING,
+    DATABASE_POOL_SIZE,
+    DATABASE_POOL_TIMEOUT,
+    DATABASE_STATEMENT_CACHE_SIZE,
+    DATABASE_URL
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool that keeps track of how long checkouts wait for a connection."""
+
+    # SQLAlchemy names a pool's logger after its class, which would put this one under the app's
+    # DEBUG logger and log every checkout. Log under SQLAlchemy's own name, as the stock pool does.
+    _sqla_logger_namespace = \
+        f"{AsyncAdaptedQueuePool.__module__}.{AsyncAdaptedQueuePool.__name__}"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def recreate(self):
+        # Carry the wait times over when the pool is recreated, e.g. after a disconnect
+        pool = super().recreate()
+        pool.checkouts, pool.total_wait, pool.max_wait = \
+            self.checkouts, self.total_wait, self.max_wait
+        return pool
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "mean_wait_seconds": self.total_wait / self.checkouts if self.checkouts else 0.0,
+            "max_wait_seconds": self.max_wait,
+        }
+
+
+def create_engine() -> AsyncEngine:
+    return create_async_engine(
+        DATABASE_URL,
+        echo=DATABASE_ECHO,
+        poolclass=TimedQueuePool,
+        pool_size=DATABASE_POOL_SIZE,
+        max_overflow=DATABASE_MAX_OVERFLOW,
+        pool_timeout=DATABASE_POOL_TIMEOUT,
+        pool_pre_ping=DATABASE_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": DATABASE_STATEMENT_CACHE_SIZE},
+    )
+
+
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Dependency opening a database session for the routes that use one."""
+    async with request.app.state.async_session() as session:
+        yield session
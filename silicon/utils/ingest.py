@@ -0,0 +1,403 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from hashlib import sha256
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import IO, TYPE_CHECKING, AsyncIterator, Awaitable, Callable
+from urllib.parse import quote, urljoin
+from uuid import uuid4
+
+from botocore.exceptions import ClientError
+from botocore.handlers import validate_bucket_name
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from silicon.constants import (
+    PDF_CHUNK_SIZE,
+    S3_ACCESS_KEY,
+    S3_BUCKET_NAME,
+    S3_MAX_POOL_CONNECTIONS,
+    S3_MULTIPART_CONCURRENCY,
+    S3_MULTIPART_PART_SIZE,
+    S3_MULTIPART_THRESHOLD,
+    S3_PUBLIC_URL,
+    S3_SECRET_KEY,
+    S3_UPLOAD_PREFIX,
+    S3_URL,
+    UPLOAD_SPOOL_DIR
+)
+from silicon.models import SafetyDataSheet, SearchOutbox
+from silicon.utils.cache import DiskCache
+from silicon.utils.metrics import stage
+from silicon.utils.pool import BoundedExecutor
+from silicon.utils.sds import parse_sds, parse_sds_file
+
+if TYPE_CHECKING:
+    from types_aiobotocore_s3.client import S3Client
+
+log = logging.getLogger("silicon")
+
+# Columns that make up the unique constraint used to match re-uploaded SDS documents
+SDS_KEY_COLUMNS = ("product_name", "product_brand", "product_number", "cas_number")
+# Columns overwritten when an upload matches an existing SDS document
+SDS_UPDATE_COLUMNS = (
+    "data",
+    "pdf_download_url",
+    "content_hash",
+    "signal_word",
+    "hazards",
+    "statements",
+    "latex_product_name",
+    "latex_cas_number",
+    "hazard_statement_overviews",
+    "page_count",
+)
+# Postgres notification channel announcing changed SDS documents, and the most ids sent at once
+SDS_CHANGED_CHANNEL = "sds_changed"
+SDS_CHANGED_CHUNK_SIZE = 500
+# Columns sent to Meilisearch for each SDS document
+SEARCH_COLUMNS = (*SDS_KEY_COLUMNS, "signal_word", "hazards", "statements")
+
+
+def hash_content(content: bytes) -> str:
+    return sha256(content).hexdigest()
+
+
+def sds_filename(product_brand: str, product_number: str) -> str:
+    return f"Sigma_Aldrich_{product_brand}_{product_number}.pdf"
+
+
+def sds_download_url(filename: str) -> str:
+    return urljoin(S3_PUBLIC_URL, quote(f"{S3_BUCKET_NAME}/{filename}"))
+
+
+def sds_key(product_identifiers: dict) -> tuple:
+    return tuple(product_identifiers[column] for column in SDS_KEY_COLUMNS)
+
+
+def search_document(sds: Row) -> dict:
+    return {"id": sds.id, **{column: getattr(sds, column) for column in SEARCH_COLUMNS}}
+
+
+@asynccontextmanager
+async def open_s3_client() -> AsyncIterator["S3Client"]:
+    """Opens an S3 client ready for use with the SDS bucket.
+
+    Clients keep a pool of connections, so open one per process and share it rather than opening
+    one per request.
+    """
+    # Pulls in aiohttp, so it is only imported once a client is needed, see PRELOAD_MODULES
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+
+    session = get_session()
+    async with session.create_client(
+        "s3",
+        endpoint_url=S3_URL,
+        aws_access_key_id=S3_ACCESS_KEY,
+        aws_secret_access_key=S3_SECRET_KEY,
+        config=AioConfig(max_pool_connections=S3_MAX_POOL_CONNECTIONS),
+    ) as client:
+        # Disable bucket name validation to support Ceph RGW tenancy
+        client.meta.events.unregister("before-parameter-build.s3", validate_bucket_name)
+        yield client
+
+
+async def put_sds_pdf(client: "S3Client", filename: str, content: bytes) -> None:
+    if len(content) > S3_MULTIPART_THRESHOLD:
+        async def read_part(offset: int, size: int) -> bytes:
+            return content[offset:offset + size]
+
+        await put_multipart(client, filename, len(content), read_part, ACL="public-read")
+    else:
+        await client.put_object(
+            ACL="public-read",
+            Bucket=S3_BUCKET_NAME,
+            Body=content,
+            Key=filename,
+        )
+
+
+async def put_file(client: "S3Client", key: str, path: str, size: int) -> None:
+    """Uploads a file from disk, reading no more than one part of it into memory at once when it
+    is large enough to be uploaded in parts."""
+    if size <= S3_MULTIPART_THRESHOLD:
+        content = await asyncio.to_thread(Path(path).read_bytes)
+        await client.put_object(Bucket=S3_BUCKET_NAME, Body=content, Key=key)
+        return
+
+    with open(path, "rb") as file:
+        def read_part(offset: int, size: int) -> Awaitable[bytes]:
+            return asyncio.to_thread(os.pread, file.fileno(), size, offset)
+
+        await put_multipart(client, key, size, read_part)
+
+
+async def put_multipart(
+    client: "S3Client",
+    key: str,
+    size: int,
+    read_part: Callable[[int, int], Awaitable[bytes]],
+    **kwargs,
+) -> None:
+    """Uploads an object in `S3_MULTIPART_PART_SIZE` parts, sending several at once.
+
+    `read_part` is called with the offset and size of each part, and any further keyword
+    arguments are passed on to `create_multipart_upload`.
+    """
+    upload = await client.create_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, **kwargs)
+    upload_id = upload["UploadId"]
+    part_slots = asyncio.Semaphore(S3_MULTIPART_CONCURRENCY)
+
+    async def upload_part(part_number: int, offset: int) -> dict:
+        async with part_slots:
+            part = await client.upload_part(
+                Bucket=S3_BUCKET_NAME,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=await read_part(offset, S3_MULTIPART_PART_SIZE),
+            )
+        return {"PartNumber": part_number, "ETag": part["ETag"]}
+
+    try:
+        parts = await asyncio.gather(*(
+            upload_part(part_number, offset)
+            for part_number, offset
+            in enumerate(range(0, size, S3_MULTIPART_PART_SIZE), start=1)
+        ))
+        await client.complete_multipart_upload(
+            Bucket=S3_BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        # Parts of abandoned uploads are stored, and billed, until the upload is aborted
+        await client.abort_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id)
+        raise
+
+
+async def get_sds_pdf(
+    client: "S3Client",
+    filename: str,
+    content_hash: str | None,
+    pdf_cache: DiskCache,
+) -> IO[bytes]:
+    """Opens an SDS PDF from the local cache, streaming it from S3 into the cache first when it
+    is not cached.
+
+    The cache is keyed by the hash of the PDF's content, so a PDF replaced in S3 is never served
+    from the cache of any host afterwards. When the object streamed from S3 doesn't match the
+    hash, as it has been replaced since the hash was read, it is served but not cached.
+    """
+    if content_hash is not None:
+        path = pdf_cache.get(content_hash)
+        if path is not None:
+            try:
+                return path.open("rb")
+            except FileNotFoundError:
+                # Evicted by another process in the meantime
+                pass
+
+    response = await client.get_object(Bucket=S3_BUCKET_NAME, Key=filename)
+    file = pdf_cache.create()
+    digest = sha256()
+    try:
+        async with response["Body"] as body:
+            while chunk := await body.read(PDF_CHUNK_SIZE):
+                file.write(chunk)
+                digest.update(chunk)
+        if content_hash is not None and digest.hexdigest() == content_hash:
+            pdf_cache.commit(content_hash, file)
+        else:
+            # Stays readable while open
+            file.flush()
+            Path(file.name).unlink(missing_ok=True)
+    except BaseException:
+        pdf_cache.discard(file)
+        raise
+
+    file.seek(0)
+    return file
+
+
+def upsert_sds(values: list[dict]) -> Insert:
+    """Builds a multi-row upsert of SDS documents, returning the resulting rows."""
+    stmt = insert(SafetyDataSheet).values(values)
+    return stmt \
+        .on_conflict_do_update(
+            index_elements=[getattr(SafetyDataSheet, column) for column in SDS_KEY_COLUMNS],
+            set_={
+                **{column: stmt.excluded[column] for column in SDS_UPDATE_COLUMNS},
+                "updated_at": func.now(),
+            },
+        ) \
+        .returning(literal_column("*"))
+
+
+async def find_sds_by_hash(db: AsyncSession, content_hashes: list[str]) -> dict[str, Row]:
+    """Finds already ingested SDS documents by the hash of their PDF."""
+    stmt = select(SafetyDataSheet.__table__) \
+        .where(SafetyDataSheet.content_hash.in_(content_hashes))
+    result = await db.execute(stmt)
+    return {sds.content_hash: sds for sds in result.fetchall()}
+
+
+async def enqueue_search_documents(db: AsyncSession, sds_ids: list[int]) -> None:
+    """Queues SDS documents for indexing in Meilisearch as part of the current transaction."""
+    if sds_ids:
+        await db.execute(insert(SearchOutbox).values([{"sds_id": sds_id} for sds_id in sds_ids]))
+
+
+async def notify_sds_changed(db: AsyncSession | AsyncConnection, sds_ids: list[int]) -> None:
+    """Tells every app process to drop the given SDS documents from its record cache, once the
+    current transaction commits."""
+    # Notification payloads are limited to 8000 bytes
+    for offset in range(0, len(sds_ids), SDS_CHANGED_CHUNK_SIZE):
+        payload = ",".join(map(str, sds_ids[offset:offset + SDS_CHANGED_CHUNK_SIZE]))
+        await db.execute(select(func.pg_notify(SDS_CHANGED_CHANNEL, payload)))
+
+
+async def ingest_sds(
+    content: bytes,
+    *,
+    db: AsyncSession,
+    s3: "S3Client",
+    parse_pool: BoundedExecutor,
+    force: bool = False,
+    wait: bool = False,
+) -> Row:
+    """Runs a single SDS PDF through the whole upload pipeline, returning its database row.
+
+    Raises `PoolFullError` if the parse pool is full and `wait` is not set.
+    """
+    content_hash = hash_content(content)
+
+    # Skip parsing entirely for a PDF we have already ingested, unless a reparse is forced
+    if not force:
+        with stage("dedup"):
+            async with db.begin():
+                existing = await find_sds_by_hash(db, [content_hash])
+
+        if content_hash in existing:
+            return existing[content_hash]
+
+    with stage("parse"):
+        sds_json, product_identifiers, checkout_fields = await parse_pool.run(
+            parse_sds,
+            content,
+            wait=wait,
+        )
+
+    filename = sds_filename(
+        product_identifiers["product_brand"],
+        product_identifiers["product_number"],
+    )
+
+    with stage("s3_put"):
+        await put_sds_pdf(s3, filename, content)
+
+    return await save_sds(db, {
+        "data": sds_json,
+        "pdf_download_url": sds_download_url(filename),
+        "content_hash": content_hash,
+        **product_identifiers,
+        **checkout_fields,
+    })
+
+
+async def ingest_sds_stream(
+    file: IO[bytes],
+    *,
+    db: AsyncSession,
+    s3: "S3Client",
+    parse_pool: BoundedExecutor,
+    force: bool = False,
+    wait: bool = False,
+) -> Row:
+    """Runs an SDS PDF through the upload pipeline like `ingest_sds`, but without holding the
+    whole PDF in memory, and uploading it to S3 while it is being parsed.
+
+    The PDF is read from `file`, such as an upload Starlette has spooled already, and copied to a
+    named file on disk that the parse pool and the S3 upload can open. As its final name depends
+    on the parsed product, it is uploaded under a temporary key in the meantime and copied into
+    place afterwards.
+    """
+    with NamedTemporaryFile(dir=UPLOAD_SPOOL_DIR, suffix=".pdf") as spool:
+        with stage("spool"):
+            content_hash = await asyncio.to_thread(copy_hashed, file, spool)
+        size = spool.tell()
+
+        if not force:
+            with stage("dedup"):
+                async with db.begin():
+                    existing = await find_sds_by_hash(db, [content_hash])
+
+            if content_hash in existing:
+                return existing[content_hash]
+
+        upload_key = f"{S3_UPLOAD_PREFIX}{uuid4().hex}.pdf"
+        upload = asyncio.create_task(put_file(s3, upload_key, spool.name, size))
+        try:
+            with stage("parse"):
+                sds_json, product_identifiers, checkout_fields = await parse_pool.run(
+                    parse_sds_file,
+                    spool.name,
+                    wait=wait,
+                )
+            # Only the part of the upload that didn't overlap with parsing
+            with stage("s3_put"):
+                await upload
+
+            filename = sds_filename(
+                product_identifiers["product_brand"],
+                product_identifiers["product_number"],
+            )
+            with stage("s3_copy"):
+                await s3.copy_object(
+                    ACL="public-read",
+                    Bucket=S3_BUCKET_NAME,
+                    CopySource={"Bucket": S3_BUCKET_NAME, "Key": upload_key},
+                    Key=filename,
+                )
+        finally:
+            upload.cancel()
+            await asyncio.gather(upload, return_exceptions=True)
+            try:
+                await s3.delete_object(Bucket=S3_BUCKET_NAME, Key=upload_key)
+            except ClientError:
+                log.warning(f"Failed to delete temporary upload {upload_key}", exc_info=True)
+
+    return await save_sds(db, {
+        "data": sds_json,
+        "pdf_download_url": sds_download_url(filename),
+        "content_hash": content_hash,
+        **product_identifiers,
+        **checkout_fields,
+    })
+
+
+def copy_hashed(source: IO[bytes], target: IO[bytes]) -> str:
+    """Copies a file in chunks, returning the hash of its content."""
+    content_hash = sha256()
+    while chunk := source.read(PDF_CHUNK_SIZE):
+        content_hash.update(chunk)
+        target.write(chunk)
+    target.flush()
+    return content_hash.hexdigest()
+
+
+async def save_sds(db: AsyncSession, values: dict) -> Row:
+    """Upserts an SDS document whose PDF has been uploaded, queueing it for search indexing."""
+    with stage("db_upsert"):
+        async with db.begin():
+            sds = (await db.execute(upsert_sds([values]))).fetchone()
+            await enqueue_search_documents(db, [sds.id])
+            await notify_sds_changed(db, [sds.id])
+
+    return sds
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import func, or_, select, update
+
+from silicon.constants import UPLOAD_JOB_POLL_INTERVAL, UPLOAD_JOB_TIMEOUT
+from silicon.models import UploadJob
+from silicon.utils.ingest import ingest_sds
+
+log = logging.getLogger("silicon")
+
+
+async def claim_upload_job(state) -> tuple[int, bytes, bool] | None:
+    """Marks the oldest pending upload job as running and returns it.
+
+    Jobs left running for longer than `UPLOAD_JOB_TIMEOUT` seconds, e.g. by a worker that
+    died, are considered pending again.
+    """
+    async with state.async_session() as session:
+        async with session.begin():
+            stmt = select(UploadJob.id, UploadJob.content, UploadJob.force) \
+                .where(or_(
+                    UploadJob.status == "pending",
+                    (UploadJob.status == "running")
+                    & (UploadJob.updated_at < func.now() - timedelta(seconds=UPLOAD_JOB_TIMEOUT)),
+                )) \
+                .order_by(UploadJob.id) \
+                .limit(1) \
+                .with_for_update(skip_locked=True)
+            job = (await session.execute(stmt)).fetchone()
+
+            if job is None:
+                return None
+
+            await session.execute(
+                update(UploadJob)
+                .where(UploadJob.id == job.id)
+                .values(status="running", updated_at=func.now())
+            )
+
+    return job.id, job.content, job.force
+
+
+async def finish_upload_job(state, job_id: int, **values) -> None:
+    async with state.async_session() as session:
+        async with session.begin():
+            await session.execute(
+                update(UploadJob)
+                .where(UploadJob.id == job_id)
+                .values(updated_at=func.now(), **values)
+            )
+
+
+async def process_upload_jobs(state) -> None:
+    """Processes queued upload jobs one at a time until cancelled."""
+    while True:
+        try:
+            job = await claim_upload_job(state)
+        except Exception:
+            log.exception("Failed to claim an upload job")
+            job = None
+
+        if job is None:
+            await asyncio.sleep(UPLOAD_JOB_POLL_INTERVAL)
+            continue
+
+        job_id, content, force = job
+        try:
+            async with state.async_session() as session:
+                sds = await ingest_sds(
+                    content,
+                    db=session,
+                    s3=state.s3,
+                    parse_pool=state.parse_pool,
+                    force=force,
+                    wait=True,
+                )
+        except Exception as e:
+            log.exception(f"Upload job {job_id} failed")
+            await finish_upload_job(state, job_id, status="failed", error=str(e) or repr(e))
+        else:
+            await finish_upload_job(state, job_id, status="done", sds_id=sds.id, content=None)
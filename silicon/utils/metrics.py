@@ -0,0 +1,131 @@
+"""Prometheus metrics, and the per-stage timings reported in the `Server-Timing` header.
+
+When gunicorn runs several workers, `PROMETHEUS_MULTIPROC_DIR` must point at a directory shared
+by them for `/metrics` to aggregate across all of them, see `gunicorn_conf.py`.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+# Stages of work done outside of any request, e.g. by upload job workers
+BACKGROUND_ROUTE = "background"
+
+REQUEST_DURATION = Histogram(
+    "silicon_request_duration_seconds",
+    "Time taken to respond to requests",
+    ["route", "method", "status"],
+)
+STAGE_DURATION = Histogram(
+    "silicon_stage_duration_seconds",
+    "Time taken by each stage of handling a request",
+    ["route", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+BOOT_DURATION = Histogram(
+    "silicon_worker_boot_seconds",
+    "Time taken by each phase of booting a worker, see silicon.utils.boot",
+    ["phase"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+PARSE_POOL_PENDING = Gauge(
+    "silicon_parse_pool_pending",
+    "SDS PDFs waiting for or being parsed",
+    multiprocess_mode="livesum",
+)
+RENDER_POOL_PENDING = Gauge(
+    "silicon_render_pool_pending",
+    "Cover sheet renders and PDF merges waiting or running",
+    multiprocess_mode="livesum",
+)
+CHECKOUTS_RUNNING = Gauge(
+    "silicon_checkouts_running",
+    "Checkouts being rendered",
+    multiprocess_mode="livesum",
+)
+CHECKOUTS_WAITING = Gauge(
+    "silicon_checkouts_waiting",
+    "Checkouts waiting for their turn to be rendered",
+    multiprocess_mode="livesum",
+)
+DATABASE_POOL_CHECKED_OUT = Gauge(
+    "silicon_database_pool_checked_out",
+    "Database connections in use",
+    multiprocess_mode="livesum",
+)
+
+# Durations of the stages of the current request, by stage
+stages: ContextVar[dict[str, float] | None] = ContextVar("stages", default=None)
+
+
+def start_stages() -> dict[str, float]:
+    """Starts collecting stage durations for the current request."""
+    durations: dict[str, float] = {}
+    stages.set(durations)
+    return durations
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times a stage of the current request. Stages that run several times add up.
+
+    Outside of a request, the duration is recorded straight away as background work.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        durations = stages.get()
+        if durations is None:
+            STAGE_DURATION.labels(BACKGROUND_ROUTE, name).observe(duration)
+        else:
+            durations[name] = durations.get(name, 0.0) + duration
+
+
+def observe_request(
+    route: str,
+    method: str,
+    status: int,
+    durations: dict[str, float],
+    total: float,
+) -> None:
+    REQUEST_DURATION.labels(route, method, status).observe(total)
+    for name, duration in durations.items():
+        STAGE_DURATION.labels(route, name).observe(duration)
+
+
+def server_timing(durations: dict[str, float], total: float) -> str:
+    """Formats stage durations as a `Server-Timing` header value, in milliseconds."""
+    return ", ".join(
+        f"{name};dur={duration * 1000:.1f}"
+        for name, duration in [*durations.items(), ("total", total)]
+    )
+
+
+def update_pool_gauges(state) -> None:
+    PARSE_POOL_PENDING.set(state.parse_pool.pending)
+    RENDER_POOL_PENDING.set(state.render_pool.pending)
+    CHECKOUTS_RUNNING.set(state.checkout_limiter.running)
+    CHECKOUTS_WAITING.set(state.checkout_limiter.waiting)
+    DATABASE_POOL_CHECKED_OUT.set(state.engine.sync_engine.pool.checkedout())
+
+
+def render_metrics() -> bytes:
+    """Renders the metrics of every worker process, or just this one outside of gunicorn."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return generate_latest(registry)
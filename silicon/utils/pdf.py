@@ -0,0 +1,41 @@
+from tempfile import SpooledTemporaryFile
+from typing import IO, Iterator
+
+from silicon.constants import PDF_CHUNK_SIZE, PDF_SPOOL_MAX_SIZE
+
+
+def merge_pdfs(files: list[IO[bytes]]) -> IO[bytes]:
+    """Merges PDFs into a temporary file, which only moves to disk past `PDF_SPOOL_MAX_SIZE`.
+
+    The returned file is positioned at the start, ready to be read.
+    """
+    from PyPDF2 import PdfMerger
+
+    merged = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    merger = PdfMerger()
+    try:
+        for file in files:
+            merger.append(file)
+        merger.write(merged)
+    except BaseException:
+        merged.close()
+        raise
+    finally:
+        merger.close()
+
+    merged.seek(0)
+    return merged
+
+
+def iter_file(file: IO[bytes]) -> Iterator[bytes]:
+    """Reads a file in chunks, closing it once it has been read."""
+    try:
+        while chunk := file.read(PDF_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+
+def warm_up() -> None:
+    """Task submitted at startup to start the render pool's threads and load the PDF merger."""
+    import PyPDF2  # noqa: F401
@@ -0,0 +1,103 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable
+
+from silicon.utils.profiling import pool_profiles, run_profiled
+from silicon.utils.sds import PARSER_MODULES, init_parser, warm_up
+
+
+class PoolFullError(Exception):
+    """Raised when work is submitted to a bounded executor that has no room left."""
+
+
+class BoundedExecutor:
+    """An executor wrapper that caps how much work may be in flight or waiting at once."""
+
+    def __init__(self, executor: Executor, max_pending: int):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.pending = 0
+        self._slots = asyncio.Semaphore(max_pending)
+
+    async def run(self, fn: Callable, *args: Any, wait: bool = False) -> Any:
+        """Runs `fn` on the executor.
+
+        Raises `PoolFullError` when every slot is taken, unless `wait` is set, in which case
+        the call waits for a slot to free up instead. When the current request is being
+        profiled, `fn` is profiled too.
+        """
+        if not wait and self._slots.locked():
+            raise PoolFullError
+
+        loop = asyncio.get_running_loop()
+        profiles = pool_profiles.get()
+        async with self._slots:
+            self.pending += 1
+            try:
+                if profiles is None:
+                    return await loop.run_in_executor(self.executor, fn, *args)
+
+                result, stats = await loop.run_in_executor(self.executor, run_profiled, fn, *args)
+                profiles.append(stats)
+                return result
+            finally:
+                self.pending -= 1
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+
+class Limiter:
+    """Limits how many operations run at once, with a bounded number waiting for their turn."""
+
+    def __init__(self, concurrency: int, max_waiting: int):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.running = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def acquire(self) -> None:
+        """Waits for a slot, raising `PoolFullError` if too many operations are already waiting."""
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            raise PoolFullError
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self) -> None:
+        self.running -= 1
+        self._slots.release()
+
+
+async def create_parse_pool(
+    workers: int,
+    max_tasks_per_child: int,
+    max_pending: int,
+) -> BoundedExecutor:
+    """Creates the SDS parse pool and starts all of its workers.
+
+    Workers are forked from a forkserver that has already imported the parser, so replacing
+    a worker after `max_tasks_per_child` tasks does not pay for the import again.
+    """
+    mp_context = multiprocessing.get_context("forkserver")
+    mp_context.set_forkserver_preload(PARSER_MODULES)
+
+    # `max_tasks_per_child` is only available from Python 3.11 onwards
+    kwargs = {"max_tasks_per_child": max_tasks_per_child} if max_tasks_per_child else {}
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=init_parser,
+        **kwargs,
+    )
+
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(executor, warm_up) for _ in range(workers)))
+
+    return BoundedExecutor(executor, max_pending)
@@ -0,0 +1,146 @@
+"""Opt-in profiling of single requests, including the work they hand off to the parse and render
+pools, see `ProfileMiddleware`.
+
+The profiler hooks into the whole event loop, so a profile also contains whatever other requests
+the process was handling at the same time. Only one request is profiled at a time per process.
+"""
+import asyncio
+import cProfile
+import os
+import pstats
+import random
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from silicon.constants import (
+    PROFILE_CLOCK,
+    PROFILE_DIR,
+    PROFILE_MAX_COUNT,
+    PROFILE_SAMPLE_RATE,
+    PROFILING
+)
+
+PROFILE_HEADER = "X-Profile"
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Stats of the work done in the pools for the request being profiled, if any
+pool_profiles: ContextVar[list[dict] | None] = ContextVar("pool_profiles", default=None)
+_profiling = False
+
+
+class _PoolProfile:
+    """Stats of work profiled in a pool, in the shape `pstats.Stats` loads them from."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def create_profiler() -> cProfile.Profile:
+    if PROFILE_CLOCK == "cpu":
+        return cProfile.Profile(time.process_time)
+    return cProfile.Profile()
+
+
+def run_profiled(fn: Callable, *args: Any) -> tuple[Any, dict]:
+    """Runs `fn` in a pool under its own profiler, returning its result and the profile stats."""
+    profiler = create_profiler()
+    result = profiler.runcall(fn, *args)
+    profiler.create_stats()
+    return result, profiler.stats
+
+
+def should_profile(headers) -> bool:
+    if not PROFILING or _profiling:
+        return False
+    return PROFILE_HEADER in headers or random.random() < PROFILE_SAMPLE_RATE
+
+
+def start_profile() -> cProfile.Profile:
+    """Starts profiling the current request, and the work it hands off to the pools."""
+    global _profiling
+    _profiling = True
+    pool_profiles.set([])
+    profiler = create_profiler()
+    profiler.enable()
+    return profiler
+
+
+async def stop_profile(profiler: cProfile.Profile, request_id: str) -> None:
+    """Stops profiling the current request and saves the profile under its request id.
+
+    The profile is saved in a thread, off the event loop and out of the profile.
+    """
+    global _profiling
+    profiler.disable()
+    _profiling = False
+    await asyncio.to_thread(save_profile, profiler, pool_profiles.get() or [], request_id)
+
+
+class ProfileMiddleware:
+    """Profiles requests sent with the `X-Profile` header, or a sample of all requests, when
+    profiling is turned on. The profile is saved under the request id returned in the
+    `X-Request-ID` header, and can be fetched from `/profiles/{request_id}`.
+
+    Streaming responses do most of their work while their body is being sent, after the endpoint
+    has returned, so the profile runs until the app has finished with the request. That's also
+    when the client went away or the app failed, so the profile is always stopped.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not should_profile(Headers(scope=scope)):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = uuid4().hex
+
+        async def send_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        profiler = start_profile()
+        try:
+            await self.app(scope, receive, send_request_id)
+        finally:
+            await stop_profile(profiler, request_id)
+
+
+def save_profile(profiler: cProfile.Profile, profiles: list[dict], request_id: str) -> None:
+    stats = pstats.Stats(profiler)
+    for profile in profiles:
+        stats.add(_PoolProfile(profile))
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats.dump_stats(profile_path(request_id))
+    prune_profiles()
+
+
+def profile_path(request_id: str) -> Path:
+    return Path(PROFILE_DIR, f"{request_id}.prof")
+
+
+def prune_profiles() -> None:
+    """Removes all but the most recent `PROFILE_MAX_COUNT` profiles."""
+    profiles = sorted(Path(PROFILE_DIR).glob("*.prof"), key=_modified_at, reverse=True)
+    for path in profiles[PROFILE_MAX_COUNT:]:
+        path.unlink(missing_ok=True)
+
+
+def _modified_at(path: Path) -> float:
+    # Another process may have pruned it already
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
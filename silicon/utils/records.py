@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from silicon.constants import SDS_CACHE_LISTEN_CHECK_INTERVAL
+from silicon.models import SafetyDataSheet
+from silicon.utils.cache import LRUCache
+from silicon.utils.ingest import SDS_CHANGED_CHANNEL
+from silicon.utils.metrics import stage
+
+log = logging.getLogger("silicon")
+
+
+# Everything but the large `data` column, which is only read when a response includes it
+SDS_RECORD_COLUMNS = [
+    column for column in SafetyDataSheet.__table__.columns if column.key != "data"
+]
+
+
+async def get_sds_records(
+    db: AsyncSession,
+    sds_cache: LRUCache,
+    sds_ids: list[int],
+    with_data: bool = False,
+) -> dict[int, Row]:
+    """Gets SDS rows by id, without their `data` unless `with_data` is set. Ids that don't exist
+    are left out.
+
+    Rows without their `data` come from this process' cache where possible and from the
+    database for the rest. Rows with it are always read from the database, and not cached.
+    """
+    records: dict[int, Row] = {}
+    misses: list[int] = []
+    for sds_id in dict.fromkeys(sds_ids):
+        sds = None if with_data else sds_cache.get(sds_id)
+        if sds is None:
+            misses.append(sds_id)
+        else:
+            records[sds_id] = sds
+
+    if misses:
+        invalidations = sds_cache.invalidations
+        columns = [SafetyDataSheet.__table__] if with_data else SDS_RECORD_COLUMNS
+        with stage("db_read"):
+            async with db.begin():
+                stmt = select(*columns).where(SafetyDataSheet.id == func.any(misses))
+                result = await db.execute(stmt)
+
+        for sds in result.fetchall():
+            if not with_data:
+                sds_cache.put(sds.id, sds, invalidations)
+            records[sds.id] = sds
+
+    # Keep the order the ids were asked for in
+    return {sds_id: records[sds_id] for sds_id in dict.fromkeys(sds_ids) if sds_id in records}
+
+
+async def listen_for_sds_changes(state) -> None:
+    """Drops SDS documents from this process' record cache as soon as any process changes them,
+    until cancelled.
+
+    Changes may be missed while the listening connection is down, so the whole cache is cleared
+    whenever it is (re)established.
+    """
+    sds_cache: LRUCache = state.sds_cache
+
+    def on_change(connection, pid, channel, payload: str) -> None:
+        for sds_id in payload.split(","):
+            sds_cache.invalidate(int(sds_id))
+
+    while True:
+        try:
+            async with state.engine.connect() as conn:
+                # LISTEN only takes effect once committed, and a pooled connection may come
+                # back from its pre-ping with a transaction open
+                await conn.execution_options(isolation_level="AUTOCOMMIT")
+                connection = (await conn.get_raw_connection()).driver_connection
+                await connection.add_listener(SDS_CHANGED_CHANNEL, on_change)
+                sds_cache.clear()
+                try:
+                    while not connection.is_closed():
+                        await asyncio.sleep(SDS_CACHE_LISTEN_CHECK_INTERVAL)
+                finally:
+                    if not connection.is_closed():
+                        await connection.remove_listener(SDS_CHANGED_CHANNEL, on_change)
+            log.warning("SDS change listener connection closed, reconnecting")
+        except Exception:
+            log.exception("SDS change listener failed, reconnecting")
+
+        sds_cache.clear()
+        await asyncio.sleep(SDS_CACHE_LISTEN_CHECK_INTERVAL)
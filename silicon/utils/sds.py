@@ -1,14 +1,104 @@
-from tungsten import SdsQueryFieldName, SigmaAldrichFieldMapper
+import json
+from io import BytesIO
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from tungsten import SigmaAldrichFieldMapper, SigmaAldrichSdsParser
 
-def get_sds_identifiers(sds_json: dict) -> dict[str, str | list[str]]:
+# The parser and its dependencies are slow to import and only needed by parse pool workers, so
+# they are imported on first use. The parse pool's forkserver preloads them instead. None of them
+# import the app, which `silicon` only builds when it is asked for.
+PARSER_MODULES = [
+    "tungsten",
+    "PyPDF2",
+    "pylatexenc.latexencode",
+    "silicon.utils.cover.templater",
+    "silicon.utils.sds",
+]
+
+# Parse pool workers build these once in `init_parser` and reuse them for every task
+sds_parser: "SigmaAldrichSdsParser | None" = None
+field_mapper: "SigmaAldrichFieldMapper | None" = None
+
+
+def init_parser() -> None:
+    """Initializes the parser for a parse pool worker so it is ready before the first task."""
+    from tungsten import SigmaAldrichFieldMapper, SigmaAldrichSdsParser
+
+    global sds_parser, field_mapper
+    sds_parser = SigmaAldrichSdsParser()
     field_mapper = SigmaAldrichFieldMapper()
+
+
+def warm_up() -> None:
+    """No-op task submitted at startup to make the pool spawn its workers ahead of time."""
+
+
+def parse_sds(content: bytes) -> tuple[dict, dict[str, str | list[str]], dict]:
+    """Parses an SDS PDF, returning its JSON representation, its product identifiers, and the
+    fields checkout needs."""
+    if sds_parser is None:
+        init_parser()
+
+    parsed_sds = sds_parser.parse_to_ghs_sds(BytesIO(content))
+    sds_json = json.loads(parsed_sds.dumps())
+    product_identifiers = get_sds_identifiers(sds_json)
+    return sds_json, product_identifiers, get_checkout_fields(content, product_identifiers)
+
+
+def parse_sds_file(path: str) -> tuple[dict, dict[str, str | list[str]], dict]:
+    """Parses an SDS PDF from disk, see `parse_sds`."""
+    with open(path, "rb") as file:
+        return parse_sds(file.read())
+
+
+def get_sds_identifiers(sds_json: dict) -> dict[str, str | list[str]]:
+    from tungsten import SdsQueryFieldName, SigmaAldrichFieldMapper
+
+    mapper = field_mapper or SigmaAldrichFieldMapper()
     return {
-        "product_name": field_mapper.get_field(SdsQueryFieldName.PRODUCT_NAME, sds_json),
-        "product_brand": field_mapper.get_field(SdsQueryFieldName.PRODUCT_BRAND, sds_json),
-        "product_number": field_mapper.get_field(SdsQueryFieldName.PRODUCT_NUMBER, sds_json),
-        "cas_number": field_mapper.get_field(SdsQueryFieldName.CAS_NUMBER, sds_json),
-        "signal_word": field_mapper.get_field(SdsQueryFieldName.SIGNAL_WORD, sds_json),
-        "hazards": field_mapper.get_field(SdsQueryFieldName.PICTOGRAM, sds_json),
-        "statements": field_mapper.get_field(SdsQueryFieldName.STATEMENTS, sds_json),
+        "product_name": mapper.get_field(SdsQueryFieldName.PRODUCT_NAME, sds_json),
+        "product_brand": mapper.get_field(SdsQueryFieldName.PRODUCT_BRAND, sds_json),
+        "product_number": mapper.get_field(SdsQueryFieldName.PRODUCT_NUMBER, sds_json),
+        "cas_number": mapper.get_field(SdsQueryFieldName.CAS_NUMBER, sds_json),
+        "signal_word": mapper.get_field(SdsQueryFieldName.SIGNAL_WORD, sds_json),
+        "hazards": mapper.get_field(SdsQueryFieldName.PICTOGRAM, sds_json),
+        "statements": mapper.get_field(SdsQueryFieldName.STATEMENTS, sds_json),
     }
+
+
+def get_checkout_fields(content: bytes, product_identifiers: dict) -> dict:
+    """Derives the fields a checkout cover sheet needs, so checkout doesn't recompute them."""
+    return {**get_cover_fields(product_identifiers), "page_count": get_page_count(content)}
+
+
+def get_cover_fields(product_identifiers: dict) -> dict:
+    """Derives the checkout fields that only depend on the product identifiers, not the PDF."""
+    return {
+        "latex_product_name": to_latex(product_identifiers["product_name"]),
+        "latex_cas_number": to_latex(product_identifiers["cas_number"]),
+        "hazard_statement_overviews": get_hazard_statement_overviews(
+            product_identifiers["statements"]
+        ),
+    }
+
+
+def get_hazard_statement_overviews(statements: list[str]) -> list[str]:
+    from silicon.utils.cover.templater import HazardStatementOverview
+
+    return sorted({
+        overview.name
+        for overview in HazardStatementOverview.get_statements([*{*statements}])
+    })
+
+
+def get_page_count(content: bytes) -> int:
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(BytesIO(content)).pages)
+
+
+def to_latex(text: str) -> str:
+    from pylatexenc.latexencode import unicode_to_latex
+
+    return unicode_to_latex(text)
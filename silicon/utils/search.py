@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from httpx import AsyncClient
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from silicon.constants import (
+    MEILI_INDEX_NAME,
+    MEILI_SYNC_CHUNK_SIZE,
+    MEILI_SYNC_SAFETY_WINDOW,
+    MEILI_TASK_TIMEOUT,
+    SEARCH_OUTBOX_BATCH_SIZE,
+    SEARCH_OUTBOX_MAX_BACKOFF,
+    SEARCH_OUTBOX_POLL_INTERVAL
+)
+from silicon.models import SafetyDataSheet, SearchOutbox, SyncState
+from silicon.utils.ingest import SEARCH_COLUMNS, search_document
+from silicon.utils.metrics import stage
+
+log = logging.getLogger("silicon")
+
+# Postgres advisory lock held while syncing, so only one process syncs at a time
+MEILI_SYNC_LOCK_KEY = 0x5111C0
+MEILI_SYNC_STATE_NAME = "meilisearch"
+
+
+async def post_documents(meili: AsyncClient, documents: list[dict]) -> int:
+    """Adds or replaces documents in the SDS index, returning the Meilisearch task uid."""
+    with stage("meili_post"):
+        response = await meili.post(f"indexes/{MEILI_INDEX_NAME}/documents", json=documents)
+    response.raise_for_status()
+    return response.json()["taskUid"]
+
+
+async def search_sds_ids(
+    meili: AsyncClient,
+    query: str,
+    offset: int,
+    limit: int,
+) -> tuple[list[int], int]:
+    """Searches the SDS index, returning the ids of the hits in ranking order and Meilisearch's
+    estimate of how many hits there are in total."""
+    with stage("meili_search"):
+        response = await meili.post(
+            f"indexes/{MEILI_INDEX_NAME}/search",
+            json={"q": query, "offset": offset, "limit": limit, "attributesToRetrieve": ["id"]},
+        )
+    response.raise_for_status()
+    result = response.json()
+    return [hit["id"] for hit in result["hits"]], result["estimatedTotalHits"]
+
+
+async def wait_for_tasks(meili: AsyncClient, task_uids: list[int]) -> list[dict]:
+    """Waits for Meilisearch to finish processing the given tasks and returns them."""
+    deadline = time.monotonic() + MEILI_TASK_TIMEOUT
+    tasks = []
+    with stage("meili_wait"):
+        for task_uid in task_uids:
+            while True:
+                response = await meili.get(f"tasks/{task_uid}")
+                response.raise_for_status()
+                task = response.json()
+                if task["status"] not in ("enqueued", "processing"):
+                    break
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Meilisearch task {task_uid} did not finish in time")
+                await asyncio.sleep(0.5)
+            tasks.append(task)
+    return tasks
+
+
+async def meili_sync(state) -> None:
+    """Sends SDS documents changed since the last sync to Meilisearch in chunks.
+
+    Only one process syncs at a time, the others skip the sync while the advisory lock is held.
+    """
+    async with state.engine.connect() as lock_conn:
+        locked = await lock_conn.scalar(select(func.pg_try_advisory_lock(MEILI_SYNC_LOCK_KEY)))
+        await lock_conn.commit()
+        if not locked:
+            log.info("Meilisearch sync is already running in another process, skipping")
+            return
+
+        try:
+            await _meili_sync(state)
+        except Exception:
+            log.exception("Meilisearch sync failed")
+        finally:
+            await lock_conn.scalar(select(func.pg_advisory_unlock(MEILI_SYNC_LOCK_KEY)))
+            await lock_conn.commit()
+
+
+async def _meili_sync(state) -> None:
+    started = time.monotonic()
+
+    async with state.async_session() as session:
+        async with session.begin():
+            high_water_mark = await session.scalar(
+                select(SyncState.high_water_mark)
+                .where(SyncState.name == MEILI_SYNC_STATE_NAME)
+            )
+
+        stmt = select(
+            SafetyDataSheet.id,
+            SafetyDataSheet.updated_at,
+            *[getattr(SafetyDataSheet, column) for column in SEARCH_COLUMNS],
+        ).order_by(SafetyDataSheet.updated_at, SafetyDataSheet.id)
+        if high_water_mark is not None:
+            # `updated_at` is the start time of the transaction that wrote the row, so rows of
+            # one that was still running at the last sync can commit below the mark. Documents
+            # are replaced by id, so re-sending the ones in the safety window is harmless.
+            since = high_water_mark - timedelta(seconds=MEILI_SYNC_SAFETY_WINDOW)
+            stmt = stmt.where(SafetyDataSheet.updated_at >= since)
+
+        task_uids: list[int] = []
+        chunk: list[dict] = []
+        synced = 0
+        new_high_water_mark = high_water_mark
+        async with session.begin():
+            async for sds in await session.stream(stmt):
+                chunk.append(search_document(sds))
+                new_high_water_mark = sds.updated_at
+                if len(chunk) >= MEILI_SYNC_CHUNK_SIZE:
+                    task_uids.append(await post_documents(state.meili, chunk))
+                    synced += len(chunk)
+                    chunk = []
+
+        if chunk:
+            task_uids.append(await post_documents(state.meili, chunk))
+            synced += len(chunk)
+
+        sent = time.monotonic()
+        tasks = await wait_for_tasks(state.meili, task_uids)
+        failed = [task for task in tasks if task["status"] != "succeeded"]
+        if failed:
+            log.error(
+                f"Meilisearch sync failed for {len(failed)} of {len(tasks)} chunks, "
+                f"first error: {failed[0].get('error')}"
+            )
+            return
+
+        if new_high_water_mark is not None:
+            async with session.begin():
+                stmt = insert(SyncState) \
+                    .values(name=MEILI_SYNC_STATE_NAME, high_water_mark=new_high_water_mark) \
+                    .on_conflict_do_update(
+                        index_elements=[SyncState.name],
+                        set_={"high_water_mark": new_high_water_mark, "updated_at": func.now()},
+                    )
+                await session.execute(stmt)
+
+    finished = time.monotonic()
+    log.info(
+        f"Meilisearch sync of {synced} documents in {len(task_uids)} chunks finished in "
+        f"{finished - started:.2f}s, {finished - sent:.2f}s of which waiting on Meilisearch"
+    )
+
+
+async def drain_search_outbox_batch(state) -> int:
+    """Sends one batch of queued SDS documents to Meilisearch, returning the batch size.
+
+    The batch is claimed in a short transaction and settled in another, so no locks are held
+    while waiting on Meilisearch. Entries that fail to index are retried later with exponential
+    backoff, as are those of a process that dies before settling them, once their claim expires.
+    """
+    async with state.async_session() as session:
+        async with session.begin():
+            stmt = select(SearchOutbox.id, SearchOutbox.sds_id) \
+                .where(SearchOutbox.next_attempt_at <= func.now()) \
+                .order_by(SearchOutbox.id) \
+                .limit(SEARCH_OUTBOX_BATCH_SIZE) \
+                .with_for_update(skip_locked=True)
+            entries = (await session.execute(stmt)).fetchall()
+
+            if not entries:
+                return 0
+
+            # Claimed for longer than sending and waiting on the documents can take
+            entry_ids = [entry.id for entry in entries]
+            await session.execute(
+                update(SearchOutbox)
+                .where(SearchOutbox.id.in_(entry_ids))
+                .values(next_attempt_at=func.now() + func.make_interval(
+                    0, 0, 0, 0, 0, 0, 2 * MEILI_TASK_TIMEOUT
+                ))
+            )
+
+            stmt = select(
+                SafetyDataSheet.id,
+                *[getattr(SafetyDataSheet, column) for column in SEARCH_COLUMNS],
+            ).where(SafetyDataSheet.id.in_({entry.sds_id for entry in entries}))
+            documents = [search_document(sds) for sds in (await session.execute(stmt))]
+
+        try:
+            [task] = await wait_for_tasks(
+                state.meili,
+                [await post_documents(state.meili, documents)],
+            )
+            if task["status"] != "succeeded":
+                raise RuntimeError(task.get("error"))
+        except Exception:
+            log.exception(f"Failed to index {len(documents)} SDS documents, retrying later")
+            backoff = func.least(
+                func.power(2, SearchOutbox.attempts),
+                SEARCH_OUTBOX_MAX_BACKOFF,
+            )
+            async with session.begin():
+                await session.execute(
+                    update(SearchOutbox)
+                    .where(SearchOutbox.id.in_(entry_ids))
+                    .values(
+                        attempts=SearchOutbox.attempts + 1,
+                        next_attempt_at=func.now() + func.make_interval(0, 0, 0, 0, 0, 0, backoff),
+                    )
+                )
+            return 0
+
+        async with session.begin():
+            await session.execute(delete(SearchOutbox).where(SearchOutbox.id.in_(entry_ids)))
+
+    return len(entries)
+
+
+async def drain_search_outbox(state) -> None:
+    """Keeps sending queued SDS documents to Meilisearch until cancelled."""
+    while True:
+        try:
+            drained = await drain_search_outbox_batch(state)
+        except Exception:
+            log.exception("Failed to drain the search outbox")
+            drained = 0
+
+        # Keep going straight away while there is a backlog
+        if drained < SEARCH_OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(SEARCH_OUTBOX_POLL_INTERVAL)
+
+
+async def get_search_outbox_backlog(state) -> dict:
+    """Returns the number of SDS documents waiting to be indexed and the age of the oldest."""
+    async with state.async_session() as session:
+        async with session.begin():
+            stmt = select(
+                func.count(SearchOutbox.id),
+                func.extract("epoch", func.now() - func.min(SearchOutbox.created_at)),
+            )
+            depth, oldest = (await session.execute(stmt)).one()
+
+    return {"depth": depth, "oldest_seconds": float(oldest) if oldest is not None else None}